@@ -27,6 +27,7 @@ CREATE TABLE IF NOT EXISTS subscribers (
   updated_at TIMESTAMP,
   UNIQUE (phone)
 );
+CREATE INDEX IF NOT EXISTS idx_subscribers_changed_at ON subscribers ((COALESCE(updated_at, created_at)));
 
 -- Table structure for table selections
 CREATE TABLE IF NOT EXISTS jackpot_selections (
@@ -94,6 +95,7 @@ CREATE TABLE IF NOT EXISTS betslips (
   parent_match_id INT,
   profile_id INT
 );
+CREATE INDEX IF NOT EXISTS idx_betslips_profile_match ON betslips (profile_id, parent_match_id);
 
 -- Table structure for table source_model
 CREATE TABLE IF NOT EXISTS source_model (
@@ -120,7 +122,35 @@ CREATE TABLE IF NOT EXISTS jackpot_matches (
   model TEXT,
   outcome TEXT,
   status TEXT,
-  UNIQUE (parent_match_id, model)
+  UNIQUE (provider, event_id, parent_match_id, model)
+);
+-- picks are per jackpot: one fixture can be in several jackpots (and providers) at once
+ALTER TABLE jackpot_matches DROP CONSTRAINT IF EXISTS jackpot_matches_parent_match_id_model_key;
+CREATE UNIQUE INDEX IF NOT EXISTS jackpot_matches_provider_event_id_parent_match_id_model_key
+  ON jackpot_matches (provider, event_id, parent_match_id, model);
+
+-- Table structure for table jackpot_tickets
+CREATE TABLE IF NOT EXISTS jackpot_tickets (
+  id SERIAL PRIMARY KEY,
+  provider TEXT,
+  event_id TEXT,
+  ticket_no INT,
+  strategy TEXT,
+  picks JSONB,
+  lines INT,
+  min_hits INT,
+  hit_probability DOUBLE PRECISION,
+  created_at TIMESTAMP,
+  UNIQUE (provider, event_id, ticket_no)
+);
+
+-- Table structure for table jackpot_fingerprints
+CREATE TABLE IF NOT EXISTS jackpot_fingerprints (
+  provider TEXT,
+  event_id TEXT,
+  fingerprint TEXT,
+  updated_at TIMESTAMP,
+  PRIMARY KEY (provider, event_id)
 );
 
 -- Table structure for table events
@@ -140,3 +170,32 @@ CREATE TABLE IF NOT EXISTS events (
 	category TEXT,
 	sport TEXT
 );
+
+-- Table structure for table odds_history (append-only, a row is written only when a price changes)
+CREATE TABLE IF NOT EXISTS odds_history (
+  id BIGSERIAL PRIMARY KEY,
+  parent_match_id BIGINT,
+  sub_type_id INT,
+  outcome_id INT,
+  special_bet_value TEXT,
+  odd_value DOUBLE PRECISION,
+  recorded_at TIMESTAMP
+);
+CREATE INDEX IF NOT EXISTS idx_odds_history_market ON odds_history (parent_match_id, sub_type_id, outcome_id, special_bet_value, recorded_at);
+CREATE INDEX IF NOT EXISTS idx_odds_history_recorded_at ON odds_history (recorded_at);
+
+-- Table structure for table fixture_map (provider fixture -> canonical fixture, "sr:<sportradar id>" where known)
+CREATE TABLE IF NOT EXISTS fixture_map (
+  provider TEXT,
+  provider_fixture_id TEXT,
+  fixture_key TEXT,
+  home_team TEXT,
+  away_team TEXT,
+  kickoff TIMESTAMP,
+  category TEXT,
+  score DOUBLE PRECISION,
+  updated_at TIMESTAMP,
+  PRIMARY KEY (provider, provider_fixture_id)
+);
+CREATE INDEX IF NOT EXISTS idx_fixture_map_fixture_key ON fixture_map (fixture_key);
+CREATE INDEX IF NOT EXISTS idx_fixture_map_kickoff ON fixture_map (kickoff);
@@ -8,10 +8,10 @@ from apscheduler.triggers.cron import CronTrigger
 import pytz  # pip install pytz if not installed
 
 from tasks.autobet import Autobet
+from tasks.live_poller import LivePoller
 from tasks.predict import Predict
 from tasks.predict_sofascore import PredictSofascore
 from tasks.predict_jackpot import PredictJackpot
-from tasks.results import Results
 from tasks.results_sofascore import ResultsSofascore
 from tasks.withdraw import Withdraw
 
@@ -25,10 +25,6 @@ logger = logging.getLogger(__name__)
 
 
 # Wrapper functions to ensure proper callable passing (avoids instant instantiation)
-def results_task():
-    results_instance = Results()
-    results_instance()  # Assuming __call__ or run method
-
 def predict_task():
     predict_instance = Predict()
     predict_instance()  # Assuming __call__ or run method
@@ -61,20 +57,11 @@ if __name__ == "__main__":
     # Start the scheduler with explicit timezone
     scheduler = BackgroundScheduler(timezone=pytz.timezone('Africa/Nairobi'))  # EAT/UTC+3 for Meru, KE
     
+    # Results are polled by a long-lived service that follows kickoff times instead of a wall-clock cron
+    live_poller = LivePoller()
+    live_poller.start()
+    
     # Add jobs with explicit CronTrigger for absolute wall-clock scheduling
-    scheduler.add_job(
-        func=results_task,
-        trigger=CronTrigger(
-            hour="0,1,15-23", # At midnight, 1am, and every hour from 3pm to 11pm 
-            minute="*",  # Every minute
-            second="0"   # At the start of the minute
-        ),
-        id="results_cron",
-        replace_existing=True,
-        misfire_grace_time=30,  # 30s grace for delays
-        coalesce=True  # Skip missed runs if piled up
-    )
-        
     scheduler.add_job(
         func=predict_task,
         trigger=CronTrigger(
@@ -95,6 +82,7 @@ if __name__ == "__main__":
     def shutdown_handler(signum, frame):
         logger.info("Shutting down scheduler...")
         scheduler.shutdown(wait=True)
+        live_poller.stop()
         sys.exit(0)
 
     signal.signal(signal.SIGINT, shutdown_handler)
@@ -107,4 +95,5 @@ if __name__ == "__main__":
             time.sleep(1)
     except (KeyboardInterrupt, SystemExit):
         logger.info("Received interrupt. Shutting down...")
-        scheduler.shutdown(wait=True)
\ No newline at end of file
+        scheduler.shutdown(wait=True)
+        live_poller.stop()
\ No newline at end of file
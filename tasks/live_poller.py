@@ -0,0 +1,140 @@
+import heapq
+import logging
+import os
+import threading
+import time
+from datetime import datetime
+from typing import Dict, List, Optional, Set
+
+from tasks.results import Results
+from utils.entities import Match, Settlement
+from utils.settlement import DIFF, TOTAL
+
+logger = logging.getLogger(__name__)
+
+
+class LivePoller:
+    """
+    Long-lived results service driven by kickoff times instead of a wall-clock cron.
+
+    Open predictions (kicked off, or kicking off within the look-ahead) are kept in memory with a heap of
+    next-poll times. Each tick polls only the matches that are due, in one Results.execute batch, and
+    reschedules them by state: fast near full time and when one goal changes the pick, slow at half-time,
+    and nothing at all while no match is live.
+    """
+    def __init__(self, results: Optional[Results] = None):
+        self.results = results or Results()
+        self.db = self.results.db
+        self.refresh_interval = int(os.getenv('LIVE_POLL_REFRESH', '300'))        # seconds between DB reloads
+        self.look_ahead = int(os.getenv('LIVE_POLL_LOOK_AHEAD_HOURS', '6'))
+        self.final_interval = int(os.getenv('LIVE_POLL_FINAL_INTERVAL', '20'))     # from the 80th minute
+        self.close_interval = int(os.getenv('LIVE_POLL_CLOSE_INTERVAL', '30'))     # one goal changes the pick
+        self.live_interval = int(os.getenv('LIVE_POLL_INTERVAL', '90'))
+        self.halftime_interval = int(os.getenv('LIVE_POLL_HALFTIME_INTERVAL', '300'))
+        self.matches: Dict[str, Match] = {}     # match_id -> last known state
+        self.stalled: Dict[str, int] = {}       # match_id -> consecutive polls without a change
+        self.queue: List[tuple] = []            # (next_poll, match_id)
+        self.retired: Set[str] = set()          # dropped while overdue without a final status, not reloaded
+        self._next_refresh = 0.0
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def refresh(self, now: float) -> None:
+        """Pick up new predictions from the DB; matches already tracked or retired keep their in-memory state."""
+        open_matches = self.db.fetch_open_matches(ahead_hours=self.look_ahead)
+        self.retired &= {match.match_id for match in open_matches}
+        for match in open_matches:
+            if match.match_id in self.matches or match.match_id in self.retired:
+                continue
+            self.matches[match.match_id] = match
+            kickoff = match.kickoff.timestamp() if match.kickoff else now
+            heapq.heappush(self.queue, (max(kickoff, now), match.match_id))
+        self._next_refresh = now + self.refresh_interval
+        logger.info('Tracking %d open matches', len(self.matches))
+
+    def is_close(self, match: Match) -> bool:
+        """True when a single goal can still flip the pick."""
+        if match.home_results is None or match.away_results is None:
+            return False
+        rule = self.results.engine.resolve(match.sub_type_id, match.outcome_id, match.bet_pick, match.special_bet_value)
+        if rule is None:
+            return False
+        metric, _, threshold = rule
+        home, away = match.home_results, match.away_results
+        value = home - away if metric == DIFF else home + away if metric == TOTAL else min(home, away)
+        return abs(value - threshold) <= 1
+
+    def interval(self, match: Match) -> Optional[int]:
+        """Seconds until the next poll of `match`, None once it is settled or should long be over."""
+        status = match.status
+        if self.results.settlement.is_final(status) or self.results.settlement.is_overdue(match, datetime.now()):
+            return None
+        minute = self.results.settlement.minute(status)
+        if 44 <= minute <= 46 and self.stalled.get(match.match_id, 0) > 0:
+            return self.halftime_interval
+        if minute >= 80:
+            return self.final_interval
+        if self.is_close(match):
+            return self.close_interval
+        return self.live_interval
+
+    def apply(self, match: Match, settlement: Optional[Settlement]) -> None:
+        if settlement is None:
+            self.stalled[match.match_id] = self.stalled.get(match.match_id, 0) + 1
+            return
+        self.stalled[match.match_id] = 0
+        match.home_results = settlement.home_score
+        match.away_results = settlement.away_score
+        match.status = settlement.status
+
+    def tick(self, now: float) -> int:
+        """Poll every due match in one batch and reschedule it. Returns the number of matches polled."""
+        due = []
+        while self.queue and self.queue[0][0] <= now:
+            _, match_id = heapq.heappop(self.queue)
+            if match_id in self.matches:
+                due.append(self.matches[match_id])
+        if not due:
+            return 0
+
+        settlements = {settlement.match_id: settlement for settlement in self.results.execute(due)}
+        for match in due:
+            self.apply(match, settlements.get(match.match_id))
+            interval = self.interval(match)
+            if interval is None:
+                if not self.results.settlement.is_final(match.status):
+                    self.retired.add(match.match_id)
+                self.matches.pop(match.match_id, None)
+                self.stalled.pop(match.match_id, None)
+            else:
+                heapq.heappush(self.queue, (now + interval, match.match_id))
+        return len(due)
+
+    def run(self) -> None:
+        logger.info('Live poller started')
+        while not self._stop.is_set():
+            now = time.time()
+            try:
+                if now >= self._next_refresh:
+                    self.refresh(now)
+                polled = self.tick(now)
+                if polled:
+                    logger.info('Polled %d matches, %d still tracked', polled, len(self.matches))
+            except Exception as e:
+                logger.error('Live poller tick failed: %s', e)
+
+            wake = min(self.queue[0][0], self._next_refresh) if self.queue else self._next_refresh
+            self._stop.wait(max(1.0, wake - time.time()))
+        logger.info('Live poller stopped')
+
+    def start(self) -> None:
+        self._thread = threading.Thread(target=self.run, name="live-poller", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 30) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def __call__(self):
+        self.run()
@@ -1,17 +1,24 @@
 
 from datetime import datetime
+from typing import List
 import os
 import json
 import logging
-import time
+import threading
 from dotenv import load_dotenv
 
 from utils.azure_models import AzureModels
 from utils.betika import Betika
 from utils.db import Db
-from utils.gemini import Gemini
-from utils.github_models import GithubModels
+from utils.entities import Prediction, ValueCandidate
+from utils.fixtures import FixtureResolver
+from utils.model_router import ModelRouter
+from utils.odds_history import OddsHistory
+from utils.odds_matrix import OddsMatrix
 from utils.one_signal import OneSignal
+from utils.pipeline import Pipeline, Stage
+from utils.sportybet_client import SportybetClient
+from utils.value_engine import betika_sportybet_candidates
 
 
 logger = logging.getLogger(__name__)
@@ -23,16 +30,26 @@ class Predict():
     def __init__(self):
         load_dotenv()
         self.betika = Betika()
-        self.gemini = Gemini()
-        self.github_models = GithubModels()
+        self.models = ModelRouter()
         self.azure_models = AzureModels()
         self.db = Db()
+        self.odds_history = OddsHistory(self.db)
+        self.odds_matrix = OddsMatrix()
+        self.odds_lock = threading.Lock()
         self.min_prob = int(os.getenv('MIN_PROB', '75'))
         self.min_odd = float(os.getenv('MIN_ODD', '1.15'))
         self.max_odd = float(os.getenv('MAX_ODD', '1.30'))
+        self.fetch_workers = int(os.getenv('PREDICT_FETCH_WORKERS', '4'))
+        self.llm_workers = int(os.getenv('PREDICT_LLM_WORKERS', '1'))
+        self.queue_size = int(os.getenv('PREDICT_QUEUE_SIZE', '8'))
+        self.value_window = int(os.getenv('PREDICT_VALUE_WINDOW', '200'))  # listing fixtures ranked per batch
+        self.min_edge = float(os.getenv('VALUE_MIN_EDGE', '0.0'))
+        self.resolver = FixtureResolver(self.db)
+        self.sportybet_client = SportybetClient(resolver=self.resolver)
+        self.value_markets = {}  # parent_match_id -> value outcomes of the fixture, best first
             
-    def prepare_query(self, parent_match_id):
-        logger.info("Preparing query for match id: %s", parent_match_id)
+    def fetch_match_details(self, parent_match_id):
+        logger.info("Fetching details for match id: %s", parent_match_id)
         url = f'https://api.betika.com/v1/uo/match?parent_match_id={parent_match_id}'
         match_details = self.betika.get_data(url)
         if not match_details:
@@ -41,22 +58,14 @@ class Predict():
         if meta['start_time'].split(' ')[1] < '14:00:00':
             return None
         
-        markets = [] 
-        for datum in match_details.get('data', []):
-            if int(datum.get('sub_type_id')) in [1, 29, 18]: # 1X2, BOTH TEAMS TO SCORE, TOTAL
-                market = {
-                    "sub_type_id": datum.get('sub_type_id'),
-                    "prediction": datum.get('name'),
-                    "odds": [
-                        { 
-                            "odd_key": odd.get('odd_key'),
-                            "odd_value": odd.get('odd_value'),
-                            "special_bet_value": odd.get('special_bet_value') ,
-                            "outcome_id": odd.get('outcome_id') 
-                        } for odd in datum.get('odds', [])]
-                }            
-            
-                markets.append(market)
+        return match_details
+    
+    def build_query(self, match_details):
+        meta = match_details.get('meta')
+        logger.info("Preparing query for match id: %s", meta.get('parent_match_id'))
+        odds_matrix = OddsMatrix()
+        odds_matrix.add_match_details(match_details)
+        markets = odds_matrix.markets(meta.get('parent_match_id'), [1, 29, 18]) # 1X2, BOTH TEAMS TO SCORE, TOTAL
         query_dict = {
             "instruction": f"""
 You are a soccer betting analyst. For the upcoming match provided in match_details, predict the most probable betting market with the highest implied probability (>75% if possible).
@@ -78,6 +87,7 @@ Be data-driven, objective, and concise."
             """,
             "match_details": meta,
             "markets": markets,
+            "value_markets": self.value_markets.get(int(meta.get('parent_match_id')), []),
             "expected_output_schema": {
                 "type": "object",
                 "properties": {
@@ -151,11 +161,11 @@ Be data-driven, objective, and concise."
         filtered_match = (
             filtered_match
                 if filtered_match
-                    and self.min_odd <= filtered_match["odd"] <= self.max_odd
-                    and filtered_match["overall_prob"] >= self.min_prob   
-                    and int(filtered_match['outcome_id']) != 3              #remove away win
-                    and filtered_match["bet_pick"].lower() != 'over 0.5'    #remove over 0.5 
-                    and 'under' not in filtered_match["bet_pick"].lower()   #remove unders       
+                    and self.min_odd <= filtered_match.odd <= self.max_odd
+                    and filtered_match.overall_prob >= self.min_prob   
+                    and int(filtered_match.outcome_id) != 3              #remove away win
+                    and filtered_match.bet_pick.lower() != 'over 0.5'    #remove over 0.5 
+                    and 'under' not in filtered_match.bet_pick.lower()   #remove unders       
             else None
         )                   
         
@@ -182,85 +192,133 @@ Be data-driven, objective, and concise."
         
         return filtered_match  
     
-    def predict_match(self, parent_match_id):   
-        try:     
-            query = self.prepare_query(parent_match_id)
-            if query:
-                logger.info("Predicting match id: %s - Invoking AI Agents...", parent_match_id)
-                response, model = self.github_models.get_response(query) 
-                if response:
-                    time.sleep(6) #10 requests per minute
-                else:
-                    response, model = self.gemini.get_response(query)   
-                    if response:
-                        time.sleep(30) #2 requests per minute
-                    # else:
-                    #     response, model = self.azure_models.get_response(query)   
-                    #     time.sleep(6) #10 requests per minute
-                    
-                if response:                 
-                    marker = '```json'
-                    index = response.find(marker)
-                    clean_response = response[index + len(marker):].strip('```') if index != -1 else response.replace(marker, '').strip('```')
-                    filtered_match = json.loads(clean_response) 
-                    logger.info(filtered_match)
-                       
-                    predicted_match = self.is_valid_match(filtered_match)    
-                              
-                    if predicted_match:
-                        self.db.insert_matches([predicted_match])    
-                        self.db.update_source_model(parent_match_id, model, predicted_match["start_time"])    
-                    
-                    return predicted_match
-            else:
-                logger.info("Skipped match id: %s", parent_match_id)
-            
+    def ask_models(self, query):
+        # GitHub Models first, Gemini as fallback, under the process-wide rate limits
+        return self.models.get_response(query)
+    
+    def parse_response(self, response):
+        marker = '```json'
+        index = response.find(marker)
+        clean_response = response[index + len(marker):].strip('```') if index != -1 else response.replace(marker, '').strip('```')
+        filtered_match = Prediction.from_json(json.loads(clean_response))
+        logger.info(filtered_match)
+        return filtered_match
+    
+    def save_prediction(self, parent_match_id, predicted_match, model):
+        self.db.insert_matches([predicted_match])    
+        self.db.update_source_model(parent_match_id, model, predicted_match.start_time)
+    
+    def rank_value(self, listing, listing_odds) -> List[ValueCandidate]:
+        """Betika prices of the listing that beat the Sportybet consensus, best edge first; added to `value_markets`."""
+        try:
+            candidates = betika_sportybet_candidates(self.resolver, self.sportybet_client.catalog, listing, listing_odds, min_edge=self.min_edge)
         except Exception as e:
-            logger.error(e)
-        
-        return None
+            logger.error("Error ranking value candidates: %s", e)
+            return []
+        for candidate in candidates:
+            self.value_markets.setdefault(candidate.parent_match_id, []).append({
+                "sub_type_id": candidate.sub_type_id,
+                "outcome_id": candidate.outcome_id,
+                "special_bet_value": candidate.special_bet_value,
+                "odd_key": candidate.bet_pick,
+                "odd_value": candidate.odd,
+                "consensus_probability": candidate.consensus_probability,
+                "edge": candidate.edge
+            })
+        return candidates
     
-    def get_upcoming_match_ids(self, live=False, last_prediction=None):    
-        total = 1001
-        limit = 1000
-        page = 1
-        matches = []
-        while limit*page < total:
-            total, page, events = self.betika.get_events(limit, page, live)
-            
-            matches.extend(
-                {
-                    "start_time": datetime.strptime(event.get('start_time'), '%Y-%m-%d %H:%M:%S'),
-                    "parent_match_id": int(event.get('parent_match_id'))
-                } for event in events
-            ) 
-            
-        sorted_matches = sorted(matches, key=lambda m: m['start_time'])  # Use key access
+    def iter_value_first(self):
+        """
+        Pipeline source: one streamed pass over the listing, in windows of `value_window` fixtures.
+        Each window's prices are recorded in the odds history and ranked, then its value fixtures are yielded
+        before the rest, so the LLM sees value first without waiting for the whole listing.
+        """
+        self.value_markets = {}
+        window = []
+        for event in self.betika.iter_events(live=False):
+            window.append(event)
+            if len(window) >= self.value_window:
+                yield from self.value_first(window)
+                window = []
+        yield from self.value_first(window)
+    
+    def value_first(self, window):
+        """A listing window with its value fixtures first; its 1X2 prices go to the odds history right away."""
+        if not window:
+            return []
+        window_odds = OddsMatrix()
+        window_odds.add_listing(window)
+        with self.odds_lock:
+            self.odds_matrix.add_listing(window)
+        # recorded with the sync, so dropping odds read from history are as fresh as the listing
+        self.odds_history.record(window_odds)
+        self.rank_value(window, window_odds)
+        return sorted(window, key=lambda event: int(event.parent_match_id) not in self.value_markets)
+    
+    def build_pipeline(self, predicted_match_ids, last_prediction=None):
+        """
+        listing -> pre-filter -> detail fetch -> prompt build -> LLM -> validate -> DB write
+        Each stage pulls from a bounded queue, so detail fetches keep running while the LLM stage is busy.
+        """
+        def pre_filter(event):
+            parent_match_id = event.parent_match_id
+            start_time = datetime.strptime(event.start_time, '%Y-%m-%d %H:%M:%S')
+            if parent_match_id in predicted_match_ids:
+                return None
+            if last_prediction is not None and start_time < last_prediction:
+                return None
+            return {"parent_match_id": parent_match_id}
+        
+        def fetch(item):
+            item["match_details"] = self.fetch_match_details(item["parent_match_id"])
+            if item["match_details"]:
+                with self.odds_lock:
+                    self.odds_matrix.add_match_details(item["match_details"])
+            else:
+                logger.info("Skipped match id: %s", item["parent_match_id"])
+                return None
+            return item
         
-        return [
-            match['parent_match_id'] 
-            for match in sorted_matches 
-            if last_prediction is None or match['start_time'] >= last_prediction
-        ]
+        def build(item):
+            item["query"] = self.build_query(item.pop("match_details"))
+            return item
+        
+        def ask(item):
+            logger.info("Predicting match id: %s - Invoking AI Agents...", item["parent_match_id"])
+            item["response"], item["model"] = self.ask_models(item.pop("query"))
+            return item if item["response"] else None
+        
+        def validate(item):
+            item["predicted_match"] = self.is_valid_match(self.parse_response(item.pop("response")))
+            return item if item["predicted_match"] else None
+        
+        def save(item):
+            self.save_prediction(item["parent_match_id"], item["predicted_match"], item["model"])
+            return item["predicted_match"]
+        
+        return Pipeline([
+            Stage("pre-filter", pre_filter, maxsize=self.queue_size),
+            Stage("fetch", fetch, workers=self.fetch_workers, maxsize=self.queue_size),
+            Stage("build", build, maxsize=self.queue_size),
+            Stage("llm", ask, workers=self.llm_workers, maxsize=self.queue_size),
+            Stage("validate", validate, maxsize=self.queue_size),
+            Stage("save", save, maxsize=self.queue_size)
+        ])
               
     def __call__(self):
         predictions = 0
         try:
             last_prediction = None #self.db.fetch_last_prediction()
-            upcoming_match_ids = self.get_upcoming_match_ids(live=False, last_prediction=last_prediction)
             predicted_match_ids = self.db.fetch_predicted_match_ids()
+            pipeline = self.build_pipeline(predicted_match_ids, last_prediction=last_prediction)
             
-            un_predicted_match_ids = [
-                match_id for match_id in upcoming_match_ids
-                if match_id not in predicted_match_ids
-            ]
-            logger.info("Found %s new matches", len(un_predicted_match_ids))
+            # fixtures with a value price go through the LLM first
+            for predicted_match in pipeline.run(self.iter_value_first()):
+                logger.info(predicted_match)                    
+                predictions += 1
             
-            for parent_match_id in un_predicted_match_ids:
-                predicted_match = self.predict_match(parent_match_id)
-                if predicted_match:
-                    logger.info(predicted_match)                    
-                    predictions += 1
+            # detail-only markets; listing prices already recorded are skipped by the delta encoding
+            self.odds_history.record(self.odds_matrix)
         
         except Exception as e:
             logger.error(e)
@@ -274,4 +332,4 @@ Be data-driven, objective, and concise."
             )
         else:
             logger.warning("No matches predicted")
-            
\ No newline at end of file
+            
@@ -1,29 +1,38 @@
 
+import concurrent.futures
+import hashlib
 import json
 import logging
-import time
+import os
+from datetime import datetime, timedelta, timezone
 
 from utils.azure_models import AzureModels
 from utils.betika import Betika
 from utils.db import Db
-from utils.gemini import Gemini
-from utils.github_models import GithubModels
+from utils.entities import FixtureMapping
+from utils.fixtures import FixtureResolver, sportradar_key
+from utils.jackpot_optimizer import JackpotOptimizer
+from utils.model_router import ModelRouter
 from utils.sportpesa import Sportpesa
 
 
 logger = logging.getLogger(__name__)
 
+EAT = timezone(timedelta(hours=3))
+
 class PredictJackpot():
     """
         main class
     """
     def __init__(self):
         self.betika = Betika()
-        self.gemini = Gemini()
-        self.github_models = GithubModels()
+        self.models = ModelRouter()
         self.azure_models = AzureModels()
         self.db = Db()
         self.sportpesa = Sportpesa()
+        self.workers = int(os.getenv('JACKPOT_WORKERS', '4'))
+        self.resolver = FixtureResolver(self.db)
+        self.optimizer = JackpotOptimizer()
     
     def prepare_query(self, match_details):
         logger.info("Preparing query for match id: %s", match_details['parent_match_id'])
@@ -102,18 +111,13 @@ Be data-driven, objective, and concise."
         query = json.dumps(query_dict, indent=4)
         return query
 
-    def predict_match(self, match_details, event_id, event_name, provider):   
+    def predict_match(self, match_details):   
+        """The model's pick for one jackpot match (with its 'model'), None if there is none."""
         try:     
             query = self.prepare_query(match_details)
             if query:
                 logger.info("Predicting match id: %s - Invoking AI Agents...", match_details['parent_match_id'])
-                response, model = self.github_models.get_response(query) 
-                if response:
-                    time.sleep(6) #10 requests per minute
-                else:
-                    response, model = self.gemini.get_response(query)   
-                    if response:
-                        time.sleep(30) #2 requests per minute
+                response, model = self.models.get_response(query)
                     
                 if response:                 
                     marker = '```json'
@@ -123,30 +127,145 @@ Be data-driven, objective, and concise."
                     logger.info(predicted_match)
                        
                     if predicted_match:
-                        self.db.insert_jackpot_match(match=predicted_match, model=model, event_id=event_id, event_name=event_name, provider=provider)    
+                        predicted_match['model'] = model
+                        return predicted_match
                     
             else:
                 logger.info("Skipped match id: %s", match_details['parent_match_id'])
             
         except Exception as e:
             logger.error(e)
+        
+        return None
+    
+    @staticmethod
+    def fingerprint(matches):
+        """Stable hash of a jackpot's fixture list."""
+        fixtures = sorted((str(match['parent_match_id']), str(match.get('start_time'))) for match in matches)
+        return hashlib.sha1(json.dumps(fixtures).encode()).hexdigest()
+    
+    def get_jackpots(self):
+        """Every active jackpot as {provider, event_id, event_name, matches}; Betika details fetched concurrently."""
+        jackpots = []
+        try:
+            event_id, matches = self.sportpesa.get_active_jackpot_matches()
+            if event_id and matches:
+                jackpots.append({"provider": "sportpesa", "event_id": event_id, "event_name": "Sportpesa Jackpot", "matches": matches})
+        except Exception as e:
+            logger.error("Error fetching Sportpesa jackpot: %s", e)
+        
+        def betika_jackpot(jackpot_id):
+            try:
+                event_name, matches = self.betika.get_jackpot_details(jackpot_id)
+                return {"provider": "betika", "event_id": jackpot_id, "event_name": event_name, "matches": matches or []}
+            except Exception as e:
+                logger.error("Error fetching Betika jackpot %s: %s", jackpot_id, e)
+        
+        with concurrent.futures.ThreadPoolExecutor(max_workers=self.workers) as executor:
+            jackpots += [jackpot for jackpot in executor.map(betika_jackpot, self.betika.get_jackpot_ids()) if jackpot]
+        return jackpots
             
+    @staticmethod
+    def kickoff(provider, start_time):
+        """Kickoff in EAT, as Betika and fixture_map store it; Sportpesa reports UTC ("2026-10-20T13:00:00Z")."""
+        if provider != "sportpesa" or not start_time:
+            return start_time
+        try:
+            kickoff = datetime.fromisoformat(str(start_time).replace("Z", "+00:00"))
+        except ValueError:
+            return start_time
+        if kickoff.tzinfo is None:
+            kickoff = kickoff.replace(tzinfo=timezone.utc)
+        return kickoff.astimezone(EAT).strftime("%Y-%m-%d %H:%M:%S")
+
+    def fixture_keys(self, jackpots):
+        """Canonical fixture key of every jackpot match, by (provider, parent_match_id)."""
+        mappings = []
+        for jackpot in jackpots:
+            for match_details in jackpot["matches"]:
+                mappings.append(FixtureMapping(
+                    provider=jackpot["provider"],
+                    provider_fixture_id=match_details['parent_match_id'],
+                    # Sportpesa jackpot ids are Sportradar match ids
+                    fixture_key=sportradar_key(match_details['parent_match_id']) if jackpot["provider"] == "sportpesa" else None,
+                    home_team=match_details['home_team'],
+                    away_team=match_details['away_team'],
+                    # same clock for both providers, or late kickoffs land on different dates and never match
+                    kickoff=self.kickoff(jackpot["provider"], match_details['start_time'])
+                ))
+        try:
+            self.resolver.resolve(mappings)
+            self.resolver.flush()
+        except Exception as e:
+            logger.error("Error resolving jackpot fixtures: %s", e)
+        # unresolved fixtures fall back to one key per provider match
+        return {
+            (mapping.provider, mapping.provider_fixture_id): mapping.fixture_key or f"{mapping.provider}:{mapping.provider_fixture_id}"
+            for mapping in mappings
+        }
+    
+    @staticmethod
+    def fan_out(pick, match_details):
+        """A fixture's pick as a row of one jackpot: that jackpot's ids, teams and display value of the outcome."""
+        if not pick:
+            return None
+        market = next((
+            market for market in match_details.get('odds', [])
+            if str(market['sub_type_id']) == str(pick['sub_type_id']) and str(market['outcome_id']) == str(pick['outcome_id'])
+        ), None)
+        return {
+            **pick,
+            'parent_match_id': match_details['parent_match_id'],
+            'start_time': match_details['start_time'],
+            'home_team': match_details['home_team'],
+            'away_team': match_details['away_team'],
+            'bet_pick': market['odd_key'] if market else pick['bet_pick']
+        }
             
+    def save_tickets(self, jackpot, picks):
+        """Ticket plan of a jackpot from its picks, stored alongside its jackpot_matches rows."""
+        try:
+            tickets = self.optimizer.optimize(picks, jackpot["matches"], provider=jackpot["provider"], event_id=jackpot["event_id"])
+            self.db.replace_jackpot_tickets(jackpot["provider"], jackpot["event_id"], tickets)
+        except Exception as e:
+            logger.error("Error planning tickets of jackpot %s: %s", jackpot["event_name"], e)
+    
     def __call__(self):
         try:
-            #sportpesa
-            event_id, matches = self.sportpesa.get_active_jackpot_matches()
-            for match_details in matches:
-                self.predict_match(match_details, event_id=event_id, event_name="Sportpesa Jackpot", provider="sportpesa")
+            jackpots = self.get_jackpots()
+            fingerprints = self.db.fetch_jackpot_fingerprints()
+            
+            pending = []
+            for jackpot in jackpots:
+                jackpot["fingerprint"] = self.fingerprint(jackpot["matches"])
+                if fingerprints.get((jackpot["provider"], str(jackpot["event_id"]))) == jackpot["fingerprint"]:
+                    logger.info("Skipping unchanged jackpot %s %s", jackpot["provider"], jackpot["event_id"])
+                else:
+                    pending.append(jackpot)
+            
+            # each distinct fixture across all changed jackpots once; the model router paces the LLM calls
+            keys = self.fixture_keys(pending)
+            with concurrent.futures.ThreadPoolExecutor(max_workers=self.workers) as executor:
+                futures = {}
+                for jackpot in pending:
+                    for match_details in jackpot["matches"]:
+                        key = keys[(jackpot["provider"], str(match_details['parent_match_id']))]
+                        if key not in futures:
+                            futures[key] = executor.submit(self.predict_match, match_details)
+                logger.info("Predicting %d distinct fixtures of %d jackpots", len(futures), len(pending))
                 
-            #betika
-            for jackpot_id in self.betika.get_jackpot_ids():            
-                event_name, matches = self.betika.get_jackpot_details(jackpot_id)
-                for match_details in matches:
-                    self.predict_match(match_details, event_id=jackpot_id, event_name=event_name, provider="betika")
+                for jackpot in pending:
+                    picks = [
+                        self.fan_out(futures[keys[(jackpot["provider"], str(match_details['parent_match_id']))]].result(), match_details)
+                        for match_details in jackpot["matches"]
+                    ]
+                    predicted = [pick for pick in picks if pick]
+                    saved = self.db.insert_jackpot_matches(predicted, event_id=jackpot["event_id"], event_name=jackpot["event_name"], provider=jackpot["provider"])
+                    logger.info("Predicted %d of %d matches of jackpot %s", len(predicted), len(picks), jackpot["event_name"])
+                    self.save_tickets(jackpot, picks)
+                    # only a fully predicted jackpot is skipped next time
+                    if saved and len(predicted) == len(picks):
+                        self.db.upsert_jackpot_fingerprint(jackpot["provider"], jackpot["event_id"], jackpot["fingerprint"])
             
         except Exception as e:
             logger.error(e)
-                
-        
-            
\ No newline at end of file
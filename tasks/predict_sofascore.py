@@ -1,6 +1,10 @@
 
 import logging
+import os
 from utils.db import Db
+from utils.entities import Prediction
+from utils.fixtures import FixtureResolver
+from utils.odds_history import OddsHistory
 from utils.one_signal import OneSignal
 from utils.sofascore_client import SofascoreClient
 from utils.sportybet_client import SportybetClient
@@ -13,27 +17,28 @@ class PredictSofascore():
     """
     def __init__(self):
         self.db = Db()
-        self.sofascore_client = SofascoreClient()
-        self.sportybet_client = SportybetClient()
+        self.resolver = FixtureResolver(self.db)
+        self.sofascore_client = SofascoreClient(resolver=self.resolver, odds_history=OddsHistory(self.db))
+        self.sportybet_client = SportybetClient(resolver=self.resolver)
+        self.sources = [source.strip() for source in os.getenv('SOFASCORE_SOURCES', 'high_value_streaks').split(',') if source.strip()] # also: dropping_odds, winning_odds
     
     def predict(self):
-        high_value_streaks = self.sofascore_client.get_high_value_streaks()
-        dropping_odds = [] #self.sofascore_client.get_dropping_odds()
-        winning_odds = [] #self.sofascore_client.get_winning_odds()
-        events = high_value_streaks + dropping_odds + winning_odds
+        events = self.sofascore_client.get_tips(self.sources)
         predicted_match_ids = self.db.fetch_predicted_match_ids()
         predictions = 0
         for event in events:
             try:
                 if 1.2 < event['odd'] < 2:
-                    sportybet_event = self.sportybet_client.search_event(event)
-                    logger.info(sportybet_event)
-                    self.db.insert_matches([sportybet_event])
-                    predictions += (1 if sportybet_event['match_id'] not in predicted_match_ids else 0)
+                    sportybet_event = Prediction.from_json(self.sportybet_client.search_event(event))
+                    if sportybet_event:
+                        logger.info(sportybet_event)
+                        self.db.insert_matches([sportybet_event])
+                        predictions += (1 if sportybet_event.match_id not in predicted_match_ids else 0)
                 
             except Exception as e:
                 logger.error("Error inserting event %s: %s", event, e)
         
+        self.resolver.flush()
         return predictions
         
             
@@ -57,6 +62,7 @@ class PredictSofascore():
         logger.info("Fetching predictions from Sofascore")
         predictions = self.predict()
         logger.info("Fetch predictions completed")
+        logger.info("Sofascore cache: %s", self.sofascore_client.cache_stats())
         
         logger.info("Booking Bet")
         self.book_bet()
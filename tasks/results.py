@@ -1,11 +1,12 @@
-import time
-import concurrent.futures
 import logging
-from typing import List, Tuple
+import os
+from datetime import datetime
+from typing import List, Optional, Tuple
 from utils.betika import Betika
-from utils.helper import Helper
 from utils.db import Db
-from utils.one_signal import OneSignal
+from utils.entities import Match, Settlement
+from utils.notifier import Notifier
+from utils.settlement import SettlementEngine, SettlementMachine
 
 
 logger = logging.getLogger(__name__)
@@ -13,135 +14,118 @@ logger = logging.getLogger(__name__)
 class Results():
     def __init__(self):
         self.betika = Betika()
-        self.helper = Helper()
         self.db = Db()
+        self.settlement = SettlementMachine()
+        self.engine = SettlementEngine()
+        self.notifier = Notifier.instance()
+        self.mode = os.getenv('RESULTS_MODE', 'listing') # listing: bulk live listing + detail fallback, details: one detail call per match
 
-    def get_status(self, home_score, away_score, match):
-        """Determine the match status based on scores and bet pick."""
+    def read_live_state(self, match: Match, meta: dict) -> Optional[Tuple[int, int, int]]:
+        """(minute, home_score, away_score) of a match in play, None if it is not in play."""
+        event_status = meta.get("event_status")
+        match_time = meta.get("match_time") #22:50
+        current_score = meta.get("current_score")
+        if not (match_time and current_score and event_status in ["1st half", "2nd half"]):
+            return None
         
-        # Handle 1x2 bets
-        if int(match.sub_type_id) == 1:
-            if (match.outcome_id == 1 and home_score <= away_score) or \
-                (match.outcome_id == 2 and home_score != away_score) or \
-                (match.outcome_id == 3 and home_score >= away_score):
-                    return ''
-        
-        # Handle double chances        
-        if int(match.sub_type_id) == 10:
-            if (match.outcome_id == 9 and home_score < away_score) or \
-                (match.outcome_id == 10 and home_score == away_score) or \
-                (match.outcome_id == 11 and home_score > away_score):
-                    return ''   
-                
-        # Handle overs/unders goals      
-        if int(match.sub_type_id) == 18:
-            if (match.bet_pick == 'over 0.5' and home_score + away_score < 1) or \
-                (match.bet_pick == 'over 1.5' and home_score + away_score < 2) or \
-                (match.bet_pick == 'over 2.5' and home_score + away_score < 3) or \
-                (match.bet_pick == 'over 3.5' and home_score + away_score < 4) or \
-                (match.bet_pick == 'under 3.5' and home_score + away_score > 3) or \
-                (match.bet_pick == 'under 4.5' and home_score + away_score > 4) or \
-                (match.bet_pick == 'under 5.5' and home_score + away_score > 5):
-                    return ''
-        
-        # Handle both teams to score      
-        if int(match.sub_type_id) == 29:
-            if (match.bet_pick == 'yes' and (home_score == 0 or away_score == 0)) or \
-                (match.bet_pick == 'no' and (home_score > 0 and away_score > 0)):
-                    return ''   
-        
-        # Handle corner bets
-        if int(match.sub_type_id) == 166:
-            if (match.bet_pick == 'over 6.5' and home_score + away_score < 7) or \
-                (match.bet_pick == 'over 7.5' and home_score + away_score < 8) or \
-                (match.bet_pick == 'over 8.5' and home_score + away_score < 9) or \
-                (match.bet_pick == 'over 8.5' and home_score + away_score < 9) or \
-                (match.bet_pick == 'under 9.5' and home_score + away_score > 9) or \
-                (match.bet_pick == 'under 10.5' and home_score + away_score > 10) or \
-                (match.bet_pick == 'under 11.5' and home_score + away_score > 11):
-                    return ''
-        
-        # Handle goal ranges
-        # if '-' in match.bet_pick:
-        #     bet_pick = match.bet_pick.split('-')
-        #     if (home_score+away_score) not in range(int(bet_pick[0]), int(bet_pick[1])+1):
-        #         return ''
-            
-        return 'WON'    
+        mins = int(match_time.split(':')[0])
+        scores = current_score.split(':')
+        home_score, away_score = int(scores[0]), int(scores[1])    
+        home_corners = meta.get("home_corners", 0)
+        away_corners = meta.get("away_corners", 0)
+        home_score = home_corners if match.sub_type_id == 166 else home_score
+        away_score = away_corners if match.sub_type_id == 166 else away_score
+        return mins, home_score, away_score
 
-    def process_match(self, match: object) -> Tuple[str, int, int, str]:
+    def read_live_states(self, matches: List[Match], metas: List[dict]) -> List[Optional[Tuple[int, int, int]]]:
+        states = []
+        for match, meta in zip(matches, metas):
+            try:
+                states.append(self.read_live_state(match, meta or {}))
+            except (ValueError, IndexError) as e:
+                logger.error('Error reading live state of match %s: %s', match.match_id, e)
+                states.append(None)
+        return states
+
+    def process_match(self, match: Match, live_state: Optional[Tuple[int, int, int]], won: Optional[bool], decided: bool) -> Optional[Settlement]:
         """
-        Process a single match: fetch details, calculate status, and update DB.
-        Returns (match_id, home_score, away_score, status) for logging.
+        Move a single match through its settlement states. `won` / `decided` are its pick evaluated by the
+        settlement engine on the live score (or the stored score when not in play), None if it cannot be evaluated.
+        Returns the new Settlement, or None if score and status are unchanged.
         """
-        try:
-            match_details = self.betika.get_match_details(match.parent_match_id, live=True)
-            if not match_details:
-                logger.info('No match details for match %s', match.match_id)
-                return match.match_id, None, None, 'No match details'
+        if live_state:
+            mins, home_score, away_score = live_state
+            settlement = self.settlement.advance(match, mins, home_score, away_score, won, decided)
+        else:
+            settlement = self.settlement.expire(match, datetime.now(), won)
+
+        if settlement is None or not self.settlement.has_changed(match, settlement):
+            return None
+
+        logger.info('%s vs %s [%s] = %s:%s - %s', match.home_team, match.away_team, match.bet_pick, settlement.home_score, settlement.away_score, settlement.status)
+        return settlement
 
-            meta = match_details.get("meta", {})
-            event_status = meta.get("event_status")
-            match_time = meta.get("match_time") #22:50
-            current_score = meta.get("current_score")
-            if match_time and current_score and event_status in ["1st half", "2nd half"]:
-                mins = int(match_time.split(':')[0])
-                scores = current_score.split(':')
-                home_score, away_score = int(scores[0]), int(scores[1])    
-                home_corners = meta.get("home_corners", 0)
-                away_corners = meta.get("away_corners", 0)
-                home_score = home_corners if match.sub_type_id == 166 else home_score
-                away_score = away_corners if match.sub_type_id == 166 else away_score
-                status = self.get_status(home_score, away_score, match)
-                status = status if mins >= 90 or (('over' in match.bet_pick or match.bet_pick == 'yes') and status == 'WON') else f"{mins} mins"
-                if home_score is not None and away_score is not None:
-                    logger.info('%s vs %s [%s] = %d:%d - %s', match.home_team, match.away_team, match.bet_pick, home_score, away_score, status)
-                
-                self.db.update_match_results(match.match_id, home_score, away_score, status)
-                
-                if status == "WON" and match.status != "WON":
-                    logger.info("Sending Notification to app users")
-                    OneSignal().send_push_notification(
-                        heading="🎉🎉 Predicted Match WON!!! 🎉🎉",
-                        message=f"{match.home_team} vs {match.away_team} :: {home_score}-{away_score} ({match.bet_pick})",
-                        image="https://tipspesa.vercel.app/static/prediction-won.jpg"
-                    )
-                    
-                return match.match_id, home_score, away_score, status
-            else:
-                # logger.info('No current score for match %s vs %s', match.home_team, match.away_team)
-                return match.match_id, None, None, None
-        except Exception as e:
-            logger.error('Error processing match %s: %s', match.match_id, e)
-            return match.match_id, None, None, 'Error: %s' % e
+    def needs_details(self, match: Match, live_matches: dict) -> bool:
+        """Corner markets are not scored in the live listing, and fixtures missing from it need a detail call."""
+        return self.mode != 'listing' or match.sub_type_id == 166 or int(match.parent_match_id) not in live_matches
 
-    def execute(self, matches) -> List[Tuple[str, int, int, str]]:
+    async def fetch_live_metas(self, matches: List[Match]) -> List[dict]:
         """
-        Fetch matches and process them concurrently.
-        Returns list of (match_id, home_score, away_score, status) for each match.
+        Live meta of every match, in input order.
+        One paged pass over the live listing serves most matches; detail calls are made concurrently for the rest.
         """
+        live_matches = await self.betika.get_live_matches_async() if self.mode == 'listing' else {}
+        detailed = [match for match in matches if self.needs_details(match, live_matches)]
+        logger.info('Live listing has %d fixtures, fetching details for %d of %d matches', len(live_matches), len(detailed), len(matches))
+        
+        all_details = await self.betika.http.gather(*(
+            self.betika.get_match_details_async(match.parent_match_id, live=True) for match in detailed
+        ))
+        details = {}
+        for match, match_details in zip(detailed, all_details):
+            if isinstance(match_details, Exception):
+                logger.error('Error fetching details for match %s: %s', match.match_id, match_details)
+                match_details = None
+            details[match.match_id] = (match_details or {}).get("meta", {})
+        
+        return [
+            details[match.match_id] if match.match_id in details else live_matches[int(match.parent_match_id)]
+            for match in matches
+        ]
 
+    def execute(self, matches: List[Match]) -> List[Settlement]:
+        """
+        Fetch live state of all matches, settle every pick in one vectorized pass, process each match
+        and write all changes in one batch.
+        Returns the Settlement of each match whose score or status changed.
+        """
         results = []
-        # Use ThreadPoolExecutor for concurrent processing
-        with concurrent.futures.ThreadPoolExecutor() as executor:
-            # Map process_match to each match concurrently
-            futures = [executor.submit(self.process_match, match) for match in matches]
-            # Collect results as they complete
-            for future in concurrent.futures.as_completed(futures):
-                try:
-                    result = future.result()
-                    match_id, home_score, away_score, status = result
-                    if home_score is not None and away_score is not None:
-                        results.append(result)
-                except Exception as e:
-                    logger.error('Error in concurrent processing: %s', e)
-                    results.append((None, None, None, 'Error: %s' % e))
+        won_matches = []
+        metas = self.betika.http.run(self.fetch_live_metas(matches))
+        live_states = self.read_live_states(matches, metas)
+        won, decided, known = self.engine.settle_matches(
+            matches,
+            [state[1] if state else match.home_results for match, state in zip(matches, live_states)],
+            [state[2] if state else match.away_results for match, state in zip(matches, live_states)]
+        )
+        for i, (match, live_state) in enumerate(zip(matches, live_states)):
+            result = self.process_match(match, live_state, bool(won[i]) if known[i] else None, bool(decided[i]))
+            if result:
+                results.append(result)
+                if result.status == "WON" and match.status != "WON":
+                    won_matches.append((match, result))
+
+        if not self.db.update_match_results_bulk(results):
+            return []
+        
+        for match, result in won_matches:
+            self.notifier.won(match.match_id, f"{match.home_team} vs {match.away_team} :: {result.home_score}-{result.away_score} ({match.bet_pick})")
 
         return results
 
     def __call__(self):
-        matches = self.helper.fetch_matches('', '=', '', limit=1000)
-        logger.info('Fetched %d matches to process', len(matches))    
+        matches = self.db.fetch_open_matches()
+        logger.info('Fetched %d open matches to process', len(matches))    
         results = self.execute(matches)
         logger.info('Updated %d matches', len(results))    
-       
\ No newline at end of file
+       
@@ -1,8 +1,12 @@
 
 import logging
+from datetime import datetime
+from typing import Dict, List
 from utils.db import Db
-from utils.one_signal import OneSignal
-from utils.sofascore_client import SofascoreClient
+from utils.entities import Settlement
+from utils.notifier import Notifier
+from utils.settlement import LIVE_STATES, MAX_MATCH_DURATION, VOID
+from utils.sofascore_client import SOFASCORE_SPORTS, SofascoreClient
 
 logger = logging.getLogger(__name__)
 
@@ -13,30 +17,60 @@ class ResultsSofascore():
     def __init__(self):
         self.sofascore_client = SofascoreClient()
         self.db = Db()
+        self.notifier = Notifier.instance()
         
         
+    def get_scheduled_events(self, started_events: List[Dict]) -> Dict[str, Dict]:
+        """One scheduled-events listing per kickoff date and sport, merged by event id."""
+        dates = sorted({
+            (event['kickoff'] or datetime.now()).strftime('%Y-%m-%d') for event in started_events
+        })
+        scheduled = {}
+        for date in dates:
+            for sport in SOFASCORE_SPORTS:
+                scheduled.update(self.sofascore_client.get_scheduled_events(sport, date))
+        return scheduled
+        
     def get_results(self):
         started_events = self.db.get_started_events()
+        if not started_events:
+            return
+        scheduled = self.get_scheduled_events(started_events)
+        settlements = []
+        won_results = []
+        misses = 0
         for event in started_events:
             event_id = event['id']
             outcome_id = event['outcome_id']
-            results = self.sofascore_client.get_match_result(event_id, outcome_id)
+            if str(event_id) in scheduled:
+                results = self.sofascore_client.settle_event(scheduled[str(event_id)], outcome_id)
+            else:
+                misses += 1
+                results = self.sofascore_client.get_match_result(event_id, outcome_id)
+            overdue = event['kickoff'] is not None and datetime.now() >= event['kickoff'] + MAX_MATCH_DURATION
+            if overdue and (not results or results['status'] in LIVE_STATES):
+                # never finished in time (postponed, abandoned, unknown to Sofascore): void instead of polling it forever
+                results = {'home_score': None, 'away_score': None, **(results or {}), 'status': VOID}
             if results:
-                self.db.update_match_results(str(event_id), results['home_score'], results['away_score'], results['status'])
-                logger.info("Updated result for event_id=%s, expected_outcome_id=%s, %s", event_id, outcome_id, results)
+                settlements.append(Settlement(match_id=str(event_id), home_score=results['home_score'], away_score=results['away_score'], status=results['status']))
+                logger.info("Result for event_id=%s, expected_outcome_id=%s, %s", event_id, outcome_id, results)
                 if results['status'] == "WON":
-                    logger.info("Sending Notification to app users")
-                    OneSignal().send_push_notification(
-                        heading="🎉🎉 Predicted Match WON!!! 🎉🎉",
-                        message=f"{results['home_team']} vs {results['away_team']} :: {results['home_score']}-{results['away_score']}",
-                        image="https://tipspesa.vercel.app/static/prediction-won.jpg"
-                    )
+                    won_results.append((event_id, results))
             else:
                 logger.info("No result available yet for event_id=%s", event_id)
+        
+        logger.info("Resolved %d of %d started events from scheduled listings", len(started_events) - misses, len(started_events))
+        if not self.db.update_match_results_bulk(settlements):
+            return
+        logger.info("Updated %d results", len(settlements))
+        
+        for event_id, results in won_results:
+            self.notifier.won(str(event_id), f"{results['home_team']} vs {results['away_team']} :: {results['home_score']}-{results['away_score']}")
                     
                 
     def __call__(self):
         logger.info("Checking for results of started events")
         self.get_results()
         logger.info("Results check completed")
+        logger.info("Sofascore cache: %s", self.sofascore_client.cache_stats())
         
\ No newline at end of file
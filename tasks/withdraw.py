@@ -2,7 +2,7 @@
 import concurrent.futures
 import logging 
 
-from utils.betika import Betika
+from utils.betika_sessions import BetikaSessions
 from utils.db import Db
 
 
@@ -10,23 +10,28 @@ logger = logging.getLogger(__name__)
 
 class Withdraw():
     def __init__(self):
-        self.betika = Betika()
+        self.sessions = BetikaSessions.instance()
         self.db = Db()
+        self.max_amount = 300000
 
     def withdraw(self, profile):
         try:
             phone = profile[0]
             password = profile[1]
-            self.betika.login(phone, password)
-            amount = min(int(self.betika.balance/3), 300000) 
+            betika = self.sessions.balance(phone, password)
+            if betika is None:
+                logger.warning("No session for profile: %s", phone)
+                return
             
-            if amount >= 50:
+            # a third of the balance, in requests of at most max_amount
+            balance = betika.balance
+            amount = min(int(balance/3), self.max_amount) 
+            while amount >= 50:
                 logger.info("Requesting withdraw phone=%s, amount=%s", phone, amount)
-                amount = min(int(self.betika.balance/3), 300000) 
-            
-                if amount==300000:
-                    self.withdraw(profile)
-                
+                if amount < self.max_amount:
+                    break
+                balance -= amount
+                amount = min(int(balance/3), self.max_amount)
                 
         except Exception as e:
             logger.error(e)
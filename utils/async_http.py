@@ -0,0 +1,133 @@
+import asyncio
+import atexit
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import asynccontextmanager
+from typing import Any, Dict, Optional
+from urllib.parse import urlsplit
+
+import aiohttp
+from dotenv import load_dotenv
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+
+class AsyncResponse:
+    """Fully read response, so it can be used after the aiohttp connection is released."""
+    __slots__ = ('status', 'headers', 'text', 'url')
+
+    def __init__(self, status: int, headers: Dict[str, str], text: str, url: str):
+        self.status = status
+        self.headers = headers
+        self.text = text
+        self.url = url
+
+    def json(self) -> Any:
+        return json.loads(self.text)
+
+    def raise_for_status(self) -> None:
+        if self.status >= 400:
+            raise aiohttp.ClientResponseError(None, (), status=self.status, message=self.text[:200])
+
+
+class AsyncRateLimiter:
+    """
+    Client-side politeness for one upstream: bounded concurrency, a minimum spacing between request starts,
+    and a cooldown during which callers should not send at all (e.g. after a bot-detection 403).
+    """
+    def __init__(self, concurrency: int, min_interval: float = 0.0, cooldown: float = 60.0):
+        self.semaphore = asyncio.Semaphore(concurrency)
+        self.min_interval = min_interval
+        self.cooldown = cooldown
+        self._next_start = 0.0
+        self._blocked_until = 0.0
+        self._lock = asyncio.Lock()
+
+    @property
+    def blocked(self) -> bool:
+        return time.monotonic() < self._blocked_until
+
+    def block(self) -> None:
+        self._blocked_until = time.monotonic() + self.cooldown
+
+    @asynccontextmanager
+    async def slot(self):
+        async with self.semaphore:
+            async with self._lock:
+                wait = self._next_start - time.monotonic()
+                if wait > 0:
+                    await asyncio.sleep(wait)
+                self._next_start = time.monotonic() + self.min_interval
+            yield
+
+
+class AsyncHttp:
+    """
+    One asyncio event loop in a background thread, shared by every upstream client.
+
+    Coroutines are submitted with `run` (blocking, for the synchronous wrappers) or awaited directly from
+    other coroutines. Requests share one aiohttp session (connection reuse) and one semaphore per host,
+    so hundreds of requests can be in flight on a single thread without flooding any one upstream.
+    """
+    _instance = None
+    _instance_lock = threading.Lock()
+
+    def __init__(self, limit_per_host: int = int(os.getenv('HTTP_LIMIT_PER_HOST', '8'))):
+        self.limit_per_host = limit_per_host
+        self.loop = asyncio.new_event_loop()
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._semaphores: Dict[str, asyncio.Semaphore] = {}
+        self._thread = threading.Thread(target=self.loop.run_forever, name="async-http", daemon=True)
+        self._thread.start()
+
+    @classmethod
+    def instance(cls) -> "AsyncHttp":
+        with cls._instance_lock:
+            if cls._instance is None:
+                cls._instance = cls()
+                atexit.register(cls._instance.close)
+            return cls._instance
+
+    def run(self, coro, timeout: Optional[float] = None):
+        """Run `coro` on the shared loop and wait for its result from a synchronous caller."""
+        return asyncio.run_coroutine_threadsafe(coro, self.loop).result(timeout)
+
+    def _get_session(self) -> aiohttp.ClientSession:
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(connector=aiohttp.TCPConnector(limit=0, ttl_dns_cache=300))
+        return self._session
+
+    def semaphore(self, host: str) -> asyncio.Semaphore:
+        semaphore = self._semaphores.get(host)
+        if semaphore is None:
+            semaphore = self._semaphores[host] = asyncio.Semaphore(self.limit_per_host)
+        return semaphore
+
+    async def request(self, method: str, url: str, headers: Optional[Dict] = None, params: Optional[Dict] = None,
+                      json_body: Any = None, data: Any = None, timeout: float = 10) -> AsyncResponse:
+        """Perform one request under the per-host semaphore. Network errors propagate to the caller."""
+        async with self.semaphore(urlsplit(url).netloc):
+            async with self._get_session().request(
+                method,
+                url,
+                headers=headers,
+                params={k: str(v) for k, v in params.items()} if params else None,
+                json=json_body,
+                data=data,
+                timeout=aiohttp.ClientTimeout(total=timeout)
+            ) as response:
+                text = await response.text()
+                return AsyncResponse(response.status, dict(response.headers), text, str(response.url))
+
+    async def gather(self, *coros):
+        """asyncio.gather that returns exceptions in place of results, keeping input order."""
+        return await asyncio.gather(*coros, return_exceptions=True)
+
+    def close(self) -> None:
+        if self._session is not None and not self._session.closed and self.loop.is_running():
+            self.run(self._session.close(), timeout=5)
@@ -1,10 +1,15 @@
 
+import asyncio
 import json
 import logging
+import aiohttp
 import cloudscraper
 from dotenv import load_dotenv
 import requests
 
+from utils.async_http import AsyncHttp
+from utils.entities import Fixture, Prediction
+
 logger = logging.getLogger(__name__)
 
 load_dotenv()   
@@ -25,41 +30,50 @@ class Betika():
         self.balance = 0.0
         self.bonus = 0.0
         self.token = None
+        self.scraper = None
+        self.http = AsyncHttp.instance()
               
-    def get_data(self, url):   
+    async def get_data_async(self, url):
         try:
-            response = requests.get(url)            
+            response = await self.http.request("GET", url, timeout=30)
             return response.json()  # Assuming the response is JSON
         
-        except requests.exceptions.HTTPError as http_err:
+        except aiohttp.ClientResponseError as http_err:
             logger.error("HTTP error occurred: %s", http_err)
-        except requests.exceptions.ConnectionError as conn_err:
+        except aiohttp.ClientConnectionError as conn_err:
             logger.error("Connection error occurred: %s", conn_err)
-        except requests.exceptions.Timeout as timeout_err:
+        except asyncio.TimeoutError as timeout_err:
             logger.error("Timeout error occurred: %s", timeout_err)
-        except requests.exceptions.RequestException as req_err:
+        except aiohttp.ClientError as req_err:
             logger.error("An error occurred: %s", req_err)
         except Exception as err:
             logger.error("Unexpected error: %s", err)
+    
+    def get_data(self, url):
+        return self.http.run(self.get_data_async(url))
         
-    def post_data(self, url, payload):
+    async def post_data_async(self, url, payload):
         try:
             # Sending the POST request
-            response = requests.post(url, data=json.dumps(payload), headers=self.headers)
+            response = await self.http.request("POST", url, headers=self.headers, data=json.dumps(payload), timeout=30)
             return response.json()
             
-        except requests.exceptions.HTTPError as http_err:
+        except aiohttp.ClientResponseError as http_err:
             logger.error("HTTP error occurred: %s", http_err)
-        except requests.exceptions.ConnectionError as conn_err:
+        except aiohttp.ClientConnectionError as conn_err:
             logger.error("Connection error occurred: %s", conn_err)
-        except requests.exceptions.Timeout as timeout_err:
+        except asyncio.TimeoutError as timeout_err:
             logger.error("Timeout error occurred: %s", timeout_err)
-        except requests.exceptions.RequestException as req_err:
+        except aiohttp.ClientError as req_err:
             logger.error("An error occurred: %s", req_err)
         except Exception as err:
             logger.error("Unexpected error: %s", err)
+    
+    def post_data(self, url, payload):
+        return self.http.run(self.post_data_async(url, payload))
                 
-    def login(self, phone, password):
+    def login(self, phone, password, scraper=None):
+        """Log in and keep the token; `scraper` reuses an existing cloudscraper session (cookies and clearance)."""
         url = f'{self.base_url}/v1/login'
         payload = {
             "mobile": phone,
@@ -67,26 +81,28 @@ class Betika():
             "src": self.src
         }
         
-        # Create a cloudscraper session
-        scraper = cloudscraper.create_scraper()
+        # Reuse the given cloudscraper session, else create one
+        self.scraper = scraper or cloudscraper.create_scraper()
 
         try:
-            response = scraper.post(url, json=payload, headers=self.headers)
+            response = self.scraper.post(url, json=payload, headers=self.headers)
             response_json = response.json()
             if response_json.get("error"):
                 logger.error(response_json)
-                return
+                return False
             
             self.phone = phone
             self.profile_id = response_json.get('data').get('user').get('id')
             self.balance = float(response_json.get('data').get('user').get('balance'))
             self.bonus = float(response_json.get('data').get('user').get('bonus'))
             self.token = response_json.get('token')                
+            return True
             
         except requests.exceptions.RequestException as e:
             logger.error("Error: %s", e)
         except ValueError as e:
             logger.error("JSON Parsing Error: %s", e)
+        return False
     
     def get_balance(self):
         url = f'{self.base_url}/v1/balance'
@@ -99,11 +115,11 @@ class Betika():
         response = self.post_data(url, payload)
         logger.info(response)
 
-        data = response.get('data')
+        data = response.get('data') if response else None
         if data:
             return data.get('balance'), data.get('bonus') 
         else:
-            return 0, 0
+            return None, None
       
     def get_events(self, limit, page, live=False):
         url = f'{self.live_url if live else self.base_url}/v1/uo/matches?tab=upcoming&period_id=-1&sport_id=14&sort_id=2&esports=false&is_srl=false&limit={limit}&page={page}'
@@ -122,20 +138,33 @@ class Betika():
             start_time = datum.get('start_time')
             
             if not is_esport and not is_srl and 'Simulated' not in category and 'International' not in category and 'Women' not in competition_name:
-                event = {
-                    "home_team": home,
-                    "away_team": away,
-                    "parent_match_id": parent_match_id,
-                    "start_time": start_time
-                }
-                events.append(event)
+                events.append(Fixture(
+                    parent_match_id=parent_match_id,
+                    match_id=datum.get('match_id'),
+                    start_time=start_time,
+                    home_team=home,
+                    away_team=away,
+                    category=category,
+                    competition_name=competition_name,
+                    home_odd=datum.get('home_odd') or None,
+                    neutral_odd=datum.get('neutral_odd') or None,
+                    away_odd=datum.get('away_odd') or None
+                ))
 
         total = int(response.get('meta').get('total'))
         current_page = int(response.get('meta').get('current_page'))
         page = current_page + 1
 
         return total, page, events
-     
+
+    def iter_events(self, limit=1000, live=False):
+        """Yield upcoming events page by page, so consumers can start before the listing is complete."""
+        total = limit + 1
+        page = 1
+        while limit*page < total:
+            total, page, events = self.get_events(limit, page, live)
+            yield from sorted(events, key=lambda e: e.start_time or '')
+
     def place_bet(self, betslips, total_odd, stake):
         url = f'{self.base_url}/v2/bet'
         payload = {
@@ -179,10 +208,38 @@ class Betika():
 
         return total, page, response.get('data')
     
-    def get_match_details(self, parent_match_id, live=False):
+    async def get_matches_async(self, limit, page, live=False):
+        url = f'{self.live_url if live else self.base_url}/v1/uo/matches?sport_id=14&sort_id=1&esports=false&is_srl=false&limit={limit}&page={page}'
+        response = await self.get_data_async(url) or {}
+        total = int((response.get('meta') or {}).get('total') or 0)
+        return total, response.get('data') or []
+    
+    async def get_live_matches_async(self, limit=100):
+        """
+        All fixtures of the live listing keyed by parent_match_id.
+        The first page gives the total, the remaining pages are fetched concurrently.
+        """
+        total, matches = await self.get_matches_async(limit, 1, live=True)
+        pages = await self.http.gather(*(
+            self.get_matches_async(limit, page, live=True) for page in range(2, (total + limit - 1)//limit + 1)
+        ))
+        for page in pages:
+            if isinstance(page, Exception):
+                logger.error("Error fetching live matches page: %s", page)
+                continue
+            matches.extend(page[1])
+        
+        return {int(match.get('parent_match_id')): match for match in matches if match.get('parent_match_id')}
+    
+    def get_live_matches(self, limit=100):
+        return self.http.run(self.get_live_matches_async(limit))
+    
+    async def get_match_details_async(self, parent_match_id, live=False):
         url = f'{self.live_url if live else self.base_url}/v1/uo/match?parent_match_id={parent_match_id}'
-        response = self.get_data(url)
-        return response 
+        return await self.get_data_async(url)
+    
+    def get_match_details(self, parent_match_id, live=False):
+        return self.http.run(self.get_match_details_async(parent_match_id, live))
     
     def get_match_ids(self, live=False):   
         limit = 100
@@ -238,21 +295,21 @@ class Betika():
                     neutral_odd = datum.get('neutral_odd', 0)
                     away_odd = datum.get('away_odd', 0)    
                                     
-                    return {
-                        'match_id': event['id'],
-                        'start_time': datum.get('start_time'),
-                        'home_team': datum.get('home_team'),
-                        'away_team': datum.get('away_team'),
-                        'category': f"{datum.get('category')} - {datum.get('competition_name')}",
-                        'prediction': '1X2',
-                        'odd': home_odd if event['bet_pick'] == "1" else away_odd if event['bet_pick'] == "2" else neutral_odd,
-                        'overall_prob': 80,
-                        'parent_match_id': datum.get('parent_match_id'),
-                        'sub_type_id': 1,
-                        'bet_pick': datum.get('home_team') if event['bet_pick'] == "1" else datum.get('away_team') if event['bet_pick'] == "2" else 'draw', 
-                        'special_bet_value': '',
-                        'outcome_id': 1 if event['bet_pick'] == "1" else 3 if event['bet_pick'] == "2" else 2
-                    }
+                    return Prediction(
+                        match_id=event['id'],
+                        start_time=datum.get('start_time'),
+                        home_team=datum.get('home_team'),
+                        away_team=datum.get('away_team'),
+                        category=f"{datum.get('category')} - {datum.get('competition_name')}",
+                        prediction='1X2',
+                        odd=home_odd if event['bet_pick'] == "1" else away_odd if event['bet_pick'] == "2" else neutral_odd,
+                        overall_prob=80,
+                        parent_match_id=datum.get('parent_match_id'),
+                        sub_type_id=1,
+                        bet_pick=datum.get('home_team') if event['bet_pick'] == "1" else datum.get('away_team') if event['bet_pick'] == "2" else 'draw', 
+                        special_bet_value='',
+                        outcome_id=1 if event['bet_pick'] == "1" else 3 if event['bet_pick'] == "2" else 2
+                    )
         
         return None
         
@@ -0,0 +1,148 @@
+import atexit
+import logging
+import os
+import threading
+import time
+from typing import Dict, Optional
+
+from utils.betika import Betika
+
+logger = logging.getLogger(__name__)
+
+
+class BetikaSession:
+    """A logged-in profile: its Betika client (token, profile_id, cloudscraper cookies and clearance), expiry and last use."""
+    __slots__ = ("phone", "password", "betika", "expires_at", "last_used", "lock")
+
+    def __init__(self, phone: str, password: str):
+        self.phone = phone
+        self.password = password
+        self.betika = Betika()
+        self.expires_at = 0.0
+        self.last_used = time.monotonic()
+        self.lock = threading.Lock()
+
+    @property
+    def valid(self) -> bool:
+        return bool(self.betika.token) and time.monotonic() < self.expires_at
+
+
+class BetikaSessions:
+    """
+    Process-wide cache of authenticated Betika sessions, shared by Autobet and Withdraw.
+
+    A profile logs in once; later runs reuse its token and cloudscraper session until `ttl` expires. A daemon
+    thread re-logs sessions in before they expire (within `margin` seconds), so bet placement normally starts
+    without the Cloudflare challenge and login round trip. Re-logins reuse the profile's scraper, keeping its
+    clearance cookies. Sessions not used for `idle_ttl` seconds are evicted and no longer refreshed.
+    """
+    _instance = None
+    _instance_lock = threading.Lock()
+
+    def __init__(self, ttl: int = int(os.getenv('BETIKA_SESSION_TTL', '10800')),
+                 margin: int = int(os.getenv('BETIKA_SESSION_REFRESH_MARGIN', '600')),
+                 check_interval: int = int(os.getenv('BETIKA_SESSION_CHECK_SECONDS', '60')),
+                 idle_ttl: int = int(os.getenv('BETIKA_SESSION_IDLE_TTL', '21600'))):
+        self.ttl = ttl
+        self.idle_ttl = idle_ttl
+        self.margin = margin
+        self.check_interval = check_interval
+        self.sessions: Dict[str, BetikaSession] = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @classmethod
+    def instance(cls) -> "BetikaSessions":
+        with cls._instance_lock:
+            if cls._instance is None:
+                cls._instance = cls()
+                atexit.register(cls._instance.stop)
+            return cls._instance
+
+    def _login(self, session: BetikaSession) -> bool:
+        if session.betika.login(session.phone, session.password, scraper=session.betika.scraper):
+            session.expires_at = time.monotonic() + self.ttl
+            logger.info("Logged in profile %s", session.phone)
+            return True
+        session.expires_at = 0.0
+        return False
+
+    def get(self, phone: str, password: str) -> Optional[Betika]:
+        """Authenticated Betika client of a profile, logging in only if there is no valid cached session."""
+        with self._lock:
+            session = self.sessions.get(phone)
+            if session is None or session.password != password:
+                session = self.sessions[phone] = BetikaSession(phone, password)
+            session.last_used = time.monotonic()
+        self.start()
+
+        with session.lock:
+            if session.valid or self._login(session):
+                return session.betika
+        return None
+
+    def invalidate(self, phone: str) -> None:
+        """Force a fresh login on the next `get`, e.g. after the token was rejected."""
+        with self._lock:
+            session = self.sessions.get(phone)
+        if session is not None:
+            session.expires_at = 0.0
+
+    def balance(self, phone: str, password: str) -> Optional[Betika]:
+        """Authenticated client with its balance and bonus re-read; logs in again once if the token was rejected."""
+        for _ in range(2):
+            betika = self.get(phone, password)
+            if betika is None:
+                return None
+            try:
+                balance, bonus = betika.get_balance()
+                if balance is not None:
+                    betika.balance, betika.bonus = float(balance), float(bonus or 0)
+                    return betika
+            except (AttributeError, TypeError, ValueError) as e:
+                logger.warning("Error reading balance of profile %s: %s", phone, e)
+            self.invalidate(phone)
+        return None
+
+    def evict(self) -> int:
+        """Drop the sessions not used for `idle_ttl`, e.g. of profiles that were removed. Returns the number evicted."""
+        now = time.monotonic()
+        with self._lock:
+            idle = [phone for phone, session in self.sessions.items() if now - session.last_used > self.idle_ttl]
+            for phone in idle:
+                del self.sessions[phone]
+        if idle:
+            logger.info("Evicted %d idle Betika sessions", len(idle))
+        return len(idle)
+
+    def refresh(self) -> int:
+        """Evict idle sessions, then re-login the ones expiring within `margin`. Returns the number refreshed."""
+        self.evict()
+        with self._lock:
+            sessions = list(self.sessions.values())
+        refreshed = 0
+        for session in sessions:
+            if session.expires_at and session.expires_at - time.monotonic() < self.margin:
+                with session.lock:
+                    refreshed += self._login(session)
+        return refreshed
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.check_interval):
+            try:
+                self.refresh()
+            except Exception as e:
+                logger.error("Error refreshing Betika sessions: %s", e)
+
+    def start(self) -> None:
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._stop.clear()
+                self._thread = threading.Thread(target=self._run, name="betika-sessions", daemon=True)
+                self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
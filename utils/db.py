@@ -1,14 +1,20 @@
+import csv
+import io
+import json
 import logging
 import os
 import uuid
 from typing import List, Dict, Any, Set, Optional
 from datetime import datetime
 
+import psycopg2
 from sqlalchemy import create_engine, text
 from sqlalchemy.engine import Engine
 from sqlalchemy.exc import SQLAlchemyError
 from dotenv import load_dotenv
 
+from utils.entities import FixtureMapping, JackpotTicket, Match, OddsMovement, Prediction, Settlement
+
 logger = logging.getLogger(__name__)
 
 
@@ -26,7 +32,7 @@ class Db:
     def _get_connection(self):
         return self.engine.connect()
 
-    def insert_matches(self, matches: List[Dict[str, Any]]) -> None:
+    def insert_matches(self, matches: List[Prediction]) -> None:
         query = text("""
             INSERT INTO matches(
                 match_id, kickoff, home_team, away_team, league, prediction, odd,
@@ -49,19 +55,19 @@ class Db:
 
         values = [
             {
-                'match_id': str(m['match_id']), #str(uuid.uuid5(uuid.NAMESPACE_DNS, f"{m['match_id']}{m['prediction']}")),
-                'kickoff': m['start_time'],
-                'home_team': m['home_team'].replace("'", "''"),
-                'away_team': m['away_team'].replace("'", "''"),
-                'league': m['category'].replace("'", "''"),
-                'prediction': m['prediction'],
-                'odd': m['odd'],
-                'overall_prob': m['overall_prob'],
-                'parent_match_id': m['parent_match_id'],
-                'sub_type_id': m['sub_type_id'],
-                'bet_pick': m['bet_pick'],
-                'special_bet_value': m['special_bet_value'],
-                'outcome_id': m['outcome_id']
+                'match_id': str(m.match_id), #str(uuid.uuid5(uuid.NAMESPACE_DNS, f"{m.match_id}{m.prediction}")),
+                'kickoff': m.start_time,
+                'home_team': m.home_team.replace("'", "''"),
+                'away_team': m.away_team.replace("'", "''"),
+                'league': m.category.replace("'", "''"),
+                'prediction': m.prediction,
+                'odd': m.odd,
+                'overall_prob': m.overall_prob,
+                'parent_match_id': m.parent_match_id,
+                'sub_type_id': m.sub_type_id,
+                'bet_pick': m.bet_pick,
+                'special_bet_value': m.special_bet_value,
+                'outcome_id': m.outcome_id
             }
             for m in matches
         ]
@@ -72,7 +78,7 @@ class Db:
         except SQLAlchemyError as e:
             logger.error("Error inserting matches: %s", e)
 
-    def fetch_matches(self, day: str, comparator: str, status: str, limit: int = 16) -> List[tuple]:
+    def fetch_matches(self, day: str, comparator: str, status: str, limit: int = 16) -> List[Match]:
         query = text(f"""
             WITH m AS (
                 SELECT * FROM matches
@@ -88,50 +94,74 @@ class Db:
         try:
             with self.engine.connect() as conn:
                 result = conn.execute(query, {'limit': limit})
-                return result.fetchall()
+                return Match.from_rows(result)
         except SQLAlchemyError as e:
             logger.error("Error fetching matches: %s", e)
             return []
 
-    def fetch_unplaced_matches(self, profile_id: str) -> List[Dict[str, Any]]:
+    def fetch_open_matches(self, days: int = 1, ahead_hours: int = 0) -> List[Match]:
+        """
+        Predictions that have kicked off (within `days`), or kick off within `ahead_hours`,
+        and are not yet in a final settlement state.
+        """
+        query = text("""
+            SELECT * FROM matches
+            WHERE kickoff <= (CURRENT_TIMESTAMP + INTERVAL '3 hours') + make_interval(hours => :ahead_hours)
+              AND kickoff > (CURRENT_TIMESTAMP + INTERVAL '3 hours') - make_interval(days => :days)
+              AND (status IS NULL OR status LIKE '% mins' OR status IN ('LIVE', 'STARTING'))
+              AND overall_prob >= 80
+            ORDER BY kickoff, match_id
+        """)
+
+        try:
+            with self.engine.connect() as conn:
+                result = conn.execute(query, {'days': days, 'ahead_hours': ahead_hours})
+                return Match.from_rows(result)
+        except SQLAlchemyError as e:
+            logger.error("Error fetching open matches: %s", e)
+            return []
+
+    def fetch_unplaced_matches(self, profile_id: str) -> List[Match]:
+        return self.fetch_unplaced_matches_by_profile([profile_id]).get(int(profile_id), [])
+
+    def fetch_unplaced_matches_by_profile(self, profile_ids: List) -> Dict[int, List[Match]]:
+        """Upcoming matches not yet on a betslip of each profile, in kickoff order, for all profiles in one query."""
+        if not profile_ids:
+            return {}
+
         query = text("""
             WITH m AS (
-                SELECT kickoff, home_team, away_team, odd, parent_match_id,
+                SELECT kickoff, home_team, away_team, odd, overall_prob, parent_match_id,
                        sub_type_id, bet_pick, special_bet_value, outcome_id
                 FROM matches
                 WHERE kickoff > (CURRENT_TIMESTAMP + INTERVAL '3 hours')
+                  AND parent_match_id IS NOT NULL
             ),
-            placed AS (
-                SELECT parent_match_id
-                FROM betslips
-                WHERE profile_id = :profile_id
+            p AS (
+                SELECT DISTINCT unnest(CAST(:profile_ids AS INT[])) AS profile_id
             )
-            SELECT m.*
-            FROM m
-            WHERE m.parent_match_id NOT IN (SELECT parent_match_id FROM placed WHERE parent_match_id IS NOT NULL)
-            ORDER BY kickoff
+            SELECT p.profile_id, m.*
+            FROM p
+            CROSS JOIN m
+            WHERE NOT EXISTS (
+                SELECT 1
+                FROM betslips b
+                WHERE b.profile_id = p.profile_id
+                  AND b.parent_match_id = m.parent_match_id
+            )
+            ORDER BY p.profile_id, m.kickoff
         """)
 
         try:
             with self.engine.connect() as conn:
-                result = conn.execute(query, {'profile_id': profile_id})
-                matches = []
+                result = conn.execute(query, {'profile_ids': [int(profile_id) for profile_id in profile_ids]})
+                unplaced = {int(profile_id): [] for profile_id in profile_ids}
                 for row in result:
-                    matches.append({
-                        'start_time': row[0],
-                        'home_team': row[1],
-                        'away_team': row[2],
-                        'odd': row[3],
-                        'parent_match_id': row[4],
-                        'sub_type_id': row[5],
-                        'bet_pick': row[6],
-                        'special_bet_value': row[7],
-                        'outcome_id': row[8]
-                    })
-                return matches
+                    unplaced[row.profile_id].append(Match.from_row(row))
+                return unplaced
         except SQLAlchemyError as e:
             logger.error("Error fetching unplaced matches: %s", e)
-            return []
+            return {}
 
     def fetch_predicted_match_ids(self) -> Set[str]:
         query = text("""
@@ -204,6 +234,38 @@ class Db:
         except SQLAlchemyError as e:
             logger.error("Error updating match results: %s", e)
 
+    def update_match_results_bulk(self, settlements: List[Settlement], chunk_size: int = 500) -> bool:
+        """One UPDATE ... FROM (VALUES ...) per chunk of settlements, all in a single transaction."""
+        if not settlements:
+            return True
+        try:
+            with self.engine.begin() as conn:
+                for start in range(0, len(settlements), chunk_size):
+                    chunk = settlements[start:start + chunk_size]
+                    rows = ", ".join(
+                        f"(CAST(:match_id_{i} AS TEXT), CAST(:home_{i} AS INT), CAST(:away_{i} AS INT), CAST(:status_{i} AS TEXT))"
+                        for i in range(len(chunk))
+                    )
+                    params = {}
+                    for i, settlement in enumerate(chunk):
+                        params[f'match_id_{i}'] = settlement.match_id
+                        params[f'home_{i}'] = settlement.home_score
+                        params[f'away_{i}'] = settlement.away_score
+                        params[f'status_{i}'] = settlement.status
+
+                    conn.execute(text(f"""
+                        UPDATE matches AS t
+                        SET home_results = v.home_results,
+                            away_results = v.away_results,
+                            status = v.status
+                        FROM (VALUES {rows}) AS v(match_id, home_results, away_results, status)
+                        WHERE t.match_id = v.match_id
+                    """), params)
+            return True
+        except SQLAlchemyError as e:
+            logger.error("Error bulk updating match results: %s", e)
+            return False
+
     def get_active_profiles(self) -> List[tuple]:
         query = text("""
             SELECT phone, password
@@ -236,6 +298,12 @@ class Db:
             logger.error("Error updating source model: %s", e)
 
     def insert_jackpot_match(self, match: Dict[str, Any], model: str, event_id: str, event_name: str, provider: str) -> None:
+        self.insert_jackpot_matches([{**match, 'model': model}], event_id, event_name, provider)
+
+    def insert_jackpot_matches(self, matches: List[Dict[str, Any]], event_id: str, event_name: str, provider: str) -> bool:
+        """Upsert the picks of one jackpot in a single statement; every match carries its 'model'."""
+        if not matches:
+            return True
         query = text("""
             INSERT INTO jackpot_matches(
                 provider, start_time, event_id, event_name, parent_match_id,
@@ -245,32 +313,94 @@ class Db:
                 :provider, :start_time, :event_id, :event_name, :parent_match_id,
                 :home_team, :away_team, :sub_type_id, :bet_pick, :outcome_id, :overall_prob, :model
             )
-            ON CONFLICT (parent_match_id, model) DO UPDATE SET
+            ON CONFLICT (provider, event_id, parent_match_id, model) DO UPDATE SET
                 bet_pick = EXCLUDED.bet_pick,
                 outcome_id = EXCLUDED.outcome_id,
                 overall_prob = EXCLUDED.overall_prob
         """)
 
-        params = {
-            'provider': provider,
-            'start_time': match['start_time'],
-            'event_id': event_id,
-            'event_name': event_name,
-            'parent_match_id': match['parent_match_id'],
-            'home_team': match['home_team'],
-            'away_team': match['away_team'],
-            'sub_type_id': match['sub_type_id'],
-            'bet_pick': match['bet_pick'],
-            'outcome_id': match['outcome_id'],
-            'overall_prob': match['overall_prob'],
-            'model': model
-        }
+        values = [
+            {
+                'provider': provider,
+                'start_time': match['start_time'],
+                'event_id': event_id,
+                'event_name': event_name,
+                'parent_match_id': match['parent_match_id'],
+                'home_team': match['home_team'],
+                'away_team': match['away_team'],
+                'sub_type_id': match['sub_type_id'],
+                'bet_pick': match['bet_pick'],
+                'outcome_id': match['outcome_id'],
+                'overall_prob': match['overall_prob'],
+                'model': match['model']
+            }
+            for match in matches
+        ]
+
+        try:
+            with self.engine.begin() as conn:
+                conn.execute(query, values)
+            return True
+        except SQLAlchemyError as e:
+            logger.error("Error inserting jackpot matches: %s", e)
+            return False
+
+    def fetch_jackpot_fingerprints(self) -> Dict[tuple, str]:
+        """Fingerprint of the fixture list last predicted for each (provider, event_id)."""
+        query = text("""
+            SELECT provider, event_id, fingerprint
+            FROM jackpot_fingerprints
+        """)
+
+        try:
+            with self.engine.connect() as conn:
+                return {(row.provider, row.event_id): row.fingerprint for row in conn.execute(query)}
+        except SQLAlchemyError as e:
+            logger.error("Error fetching jackpot fingerprints: %s", e)
+            return {}
+
+    def upsert_jackpot_fingerprint(self, provider: str, event_id: str, fingerprint: str) -> bool:
+        query = text("""
+            INSERT INTO jackpot_fingerprints(provider, event_id, fingerprint, updated_at)
+            VALUES(:provider, :event_id, :fingerprint, CURRENT_TIMESTAMP + INTERVAL '3 hours')
+            ON CONFLICT (provider, event_id) DO UPDATE SET
+                fingerprint = EXCLUDED.fingerprint,
+                updated_at = EXCLUDED.updated_at
+        """)
+
+        try:
+            with self.engine.begin() as conn:
+                conn.execute(query, {'provider': provider, 'event_id': str(event_id), 'fingerprint': fingerprint})
+            return True
+        except SQLAlchemyError as e:
+            logger.error("Error upserting jackpot fingerprint: %s", e)
+            return False
+
+    def replace_jackpot_tickets(self, provider: str, event_id: str, tickets: List[JackpotTicket]) -> bool:
+        """Replace the ticket plan of a jackpot in one transaction."""
+        delete = text("""
+            DELETE FROM jackpot_tickets
+            WHERE provider = :provider AND event_id = :event_id
+        """)
+        insert = text("""
+            INSERT INTO jackpot_tickets(
+                provider, event_id, ticket_no, strategy, picks, lines, min_hits, hit_probability, created_at
+            )
+            VALUES(
+                :provider, :event_id, :ticket_no, :strategy, CAST(:picks AS JSONB), :lines, :min_hits, :hit_probability,
+                CURRENT_TIMESTAMP + INTERVAL '3 hours'
+            )
+        """)
 
         try:
             with self.engine.begin() as conn:
-                conn.execute(query, params)
+                conn.execute(delete, {'provider': provider, 'event_id': str(event_id)})
+                if tickets:
+                    conn.execute(insert, [{**ticket.to_dict(), 'picks': json.dumps(ticket.picks)} for ticket in tickets])
+            return True
         except SQLAlchemyError as e:
-            logger.error("Error inserting jackpot match: %s", e)
+            logger.error("Error replacing jackpot tickets: %s", e)
+            return False
 
     def insert_event(self, event: Dict[str, Any]) -> None:
         query = text("""
@@ -308,7 +438,7 @@ class Db:
 
     def get_started_events(self) -> List[Dict[str, Any]]:
         query = text("""
-            SELECT match_id, special_bet_value
+            SELECT match_id, special_bet_value, kickoff
             FROM matches
             WHERE kickoff < CURRENT_TIMESTAMP + INTERVAL '3 hours'
               AND (status IS NULL OR status IN ('LIVE', 'STARTING'))
@@ -321,7 +451,8 @@ class Db:
                 for row in result:
                     events.append({
                         'id': row[0],
-                        'outcome_id': row[1]
+                        'outcome_id': row[1],
+                        'kickoff': row[2]
                     })
                 return events
         except SQLAlchemyError as e:
@@ -389,4 +520,170 @@ class Db:
                 return events
         except SQLAlchemyError as e:
             logger.error("Error fetching upcoming events: %s", e)
-            return []
\ No newline at end of file
+            return []
+
+    def copy_odds_history(self, rows: List[tuple]) -> bool:
+        """Bulk append (parent_match_id, sub_type_id, outcome_id, special_bet_value, odd_value, recorded_at) rows via COPY."""
+        if not rows:
+            return True
+
+        buffer = io.StringIO()
+        csv.writer(buffer).writerows(rows)
+        buffer.seek(0)
+
+        connection = self.engine.raw_connection()
+        try:
+            with connection.cursor() as cursor:
+                cursor.copy_expert(
+                    """
+                    COPY odds_history(parent_match_id, sub_type_id, outcome_id, special_bet_value, odd_value, recorded_at)
+                    FROM STDIN WITH (FORMAT csv)
+                    """,
+                    buffer
+                )
+            connection.commit()
+            return True
+        except (SQLAlchemyError, psycopg2.Error) as e:
+            connection.rollback()
+            logger.error("Error copying odds history: %s", e)
+            return False
+        finally:
+            connection.close()
+
+    def fetch_latest_odds(self, hours: int = 72) -> Dict[tuple, float]:
+        """Latest recorded price per (parent_match_id, sub_type_id, outcome_id, special_bet_value)."""
+        query = text("""
+            SELECT DISTINCT ON (parent_match_id, sub_type_id, outcome_id, special_bet_value)
+                   parent_match_id, sub_type_id, outcome_id, special_bet_value, odd_value
+            FROM odds_history
+            WHERE recorded_at > (CURRENT_TIMESTAMP + INTERVAL '3 hours') - make_interval(hours => :hours)
+            ORDER BY parent_match_id, sub_type_id, outcome_id, special_bet_value, recorded_at DESC
+        """)
+
+        try:
+            with self.engine.connect() as conn:
+                result = conn.execute(query, {'hours': hours})
+                return {(row[0], row[1], row[2], row[3] or ''): row[4] for row in result}
+        except SQLAlchemyError as e:
+            logger.error("Error fetching latest odds: %s", e)
+            return {}
+
+    def fetch_odds_movements(self, hours: int = 24, lookback_hours: int = 72) -> List[OddsMovement]:
+        """
+        Opening vs current price of every outcome that moved in the last `hours`.
+        The opening price is the last one recorded before the window (within `lookback_hours`), else the first inside it.
+        """
+        query = text("""
+            WITH bounds AS (
+                SELECT (CURRENT_TIMESTAMP + INTERVAL '3 hours') - make_interval(hours => :hours) AS since,
+                       (CURRENT_TIMESTAMP + INTERVAL '3 hours') - make_interval(hours => :lookback_hours) AS horizon
+            ),
+            baseline AS (
+                SELECT DISTINCT ON (h.parent_match_id, h.sub_type_id, h.outcome_id, h.special_bet_value)
+                       h.parent_match_id, h.sub_type_id, h.outcome_id, h.special_bet_value, h.odd_value, h.recorded_at
+                FROM odds_history h, bounds b
+                WHERE h.recorded_at < b.since AND h.recorded_at >= b.horizon
+                ORDER BY h.parent_match_id, h.sub_type_id, h.outcome_id, h.special_bet_value, h.recorded_at DESC
+            ),
+            window_rows AS (
+                SELECT * FROM baseline
+                UNION ALL
+                SELECT h.parent_match_id, h.sub_type_id, h.outcome_id, h.special_bet_value, h.odd_value, h.recorded_at
+                FROM odds_history h, bounds b
+                WHERE h.recorded_at >= b.since
+            )
+            SELECT parent_match_id, sub_type_id, outcome_id, special_bet_value,
+                   (ARRAY_AGG(odd_value ORDER BY recorded_at))[1] AS opening_odd,
+                   (ARRAY_AGG(odd_value ORDER BY recorded_at DESC))[1] AS current_odd,
+                   COUNT(*) - 1 AS changes,
+                   MAX(recorded_at) AS last_change
+            FROM window_rows
+            GROUP BY parent_match_id, sub_type_id, outcome_id, special_bet_value
+            HAVING COUNT(*) > 1
+        """)
+
+        try:
+            with self.engine.connect() as conn:
+                result = conn.execute(query, {'hours': hours, 'lookback_hours': lookback_hours})
+                return OddsMovement.from_rows(result)
+        except SQLAlchemyError as e:
+            logger.error("Error fetching odds movements: %s", e)
+            return []
+
+    def fetch_subscribers(self, since: Optional[datetime] = None) -> List[tuple]:
+        """(id, expires_at, changed_at) of subscribers changed after `since`, all of them if None."""
+        query = text("""
+            SELECT id, expires_at, COALESCE(updated_at, created_at) AS changed_at
+            FROM subscribers
+            WHERE CAST(:since AS TIMESTAMP) IS NULL OR COALESCE(updated_at, created_at) >= :since
+        """)
+
+        try:
+            with self.engine.connect() as conn:
+                result = conn.execute(query, {'since': since})
+                return [tuple(row) for row in result]
+        except SQLAlchemyError as e:
+            logger.error("Error fetching subscribers: %s", e)
+            return []
+
+    def fetch_fixture_keys(self, provider: str, provider_fixture_ids: List[str]) -> Dict[str, str]:
+        """Canonical fixture key of each already mapped provider fixture id."""
+        if not provider_fixture_ids:
+            return {}
+        query = text("""
+            SELECT provider_fixture_id, fixture_key
+            FROM fixture_map
+            WHERE provider = :provider AND provider_fixture_id = ANY(:ids)
+        """)
+
+        try:
+            with self.engine.connect() as conn:
+                result = conn.execute(query, {'provider': provider, 'ids': [str(i) for i in provider_fixture_ids]})
+                return {row[0]: row[1] for row in result}
+        except SQLAlchemyError as e:
+            logger.error("Error fetching fixture keys: %s", e)
+            return {}
+
+    def fetch_fixture_mappings(self, dates: List[str]) -> List[FixtureMapping]:
+        """Mapped fixtures kicking off on any of `dates` (YYYY-MM-DD), the candidates for matching new fixtures."""
+        if not dates:
+            return []
+        query = text("""
+            SELECT DISTINCT ON (fixture_key) provider, provider_fixture_id, fixture_key, home_team, away_team, kickoff, category, score
+            FROM fixture_map
+            WHERE kickoff::date = ANY(CAST(:dates AS DATE[]))
+            ORDER BY fixture_key, score DESC
+        """)
+
+        try:
+            with self.engine.connect() as conn:
+                result = conn.execute(query, {'dates': list(dates)})
+                return FixtureMapping.from_rows(result)
+        except SQLAlchemyError as e:
+            logger.error("Error fetching fixture mappings: %s", e)
+            return []
+
+    def upsert_fixture_mappings(self, mappings: List[FixtureMapping]) -> bool:
+        if not mappings:
+            return True
+        query = text("""
+            INSERT INTO fixture_map(
+                provider, provider_fixture_id, fixture_key, home_team, away_team, kickoff, category, score, updated_at
+            )
+            VALUES(
+                :provider, :provider_fixture_id, :fixture_key, :home_team, :away_team, :kickoff, :category, :score,
+                CURRENT_TIMESTAMP + INTERVAL '3 hours'
+            )
+            ON CONFLICT (provider, provider_fixture_id) DO UPDATE SET
+                fixture_key = EXCLUDED.fixture_key,
+                score = EXCLUDED.score,
+                updated_at = EXCLUDED.updated_at
+        """)
+
+        try:
+            with self.engine.begin() as conn:
+                conn.execute(query, [mapping.to_dict() for mapping in mappings])
+            return True
+        except SQLAlchemyError as e:
+            logger.error("Error upserting fixture mappings: %s", e)
+            return False
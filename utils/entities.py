@@ -1,20 +1,112 @@
 
-class Match():     
-    def __init__(self):
-        self.match_id = None
-        self.kickoff = None
-        self.home_team = None
-        self.away_team = None
-        self.league = None
-        self.prediction = None
-        self.odd = 0
-        self.home_results = None
-        self.status = None
-        self.away_results = None
-        self.overall_prob = 0
-        self.sub_type_id = 0
-        self.parent_match_id = None
-        self.bet_pick = None
-        self.outcome_id = 0
-        self.special_bet_value = None
-     
\ No newline at end of file
+class Record():
+    """
+    Base for the slotted record types below.
+    Fields are declared in __slots__, optional per-field casts in _casts. Unknown keys are ignored,
+    so records can be built straight from API json, SQLAlchemy rows or other records.
+    """
+    __slots__ = ()
+    _casts = {}
+
+    def __init__(self, **fields):
+        casts = self._casts
+        for name in self.__slots__:
+            value = fields.get(name)
+            if value is not None and name in casts:
+                value = casts[name](value)
+            setattr(self, name, value)
+
+    @classmethod
+    def from_json(cls, data):
+        return cls(**data) if data else None
+
+    @classmethod
+    def from_row(cls, row):
+        return cls(**row._mapping)
+
+    @classmethod
+    def from_rows(cls, rows):
+        return [cls(**row._mapping) for row in rows]
+
+    def to_dict(self):
+        return {name: getattr(self, name) for name in self.__slots__}
+
+    def __eq__(self, other):
+        return type(self) is type(other) and all(getattr(self, name) == getattr(other, name) for name in self.__slots__)
+
+    def __repr__(self):
+        fields = ', '.join(f"{name}={getattr(self, name)!r}" for name in self.__slots__)
+        return f"{type(self).__name__}({fields})"
+
+
+class Fixture(Record):
+    """An upcoming fixture from a bookmaker listing."""
+    __slots__ = (
+        'parent_match_id', 'match_id', 'start_time', 'home_team', 'away_team',
+        'category', 'competition_name', 'home_odd', 'neutral_odd', 'away_odd'
+    )
+    _casts = {'parent_match_id': int, 'home_odd': float, 'neutral_odd': float, 'away_odd': float}
+
+
+class Prediction(Record):
+    """A picked market for a fixture, as returned by the AI models or built from a tip source."""
+    __slots__ = (
+        'parent_match_id', 'match_id', 'start_time', 'home_team', 'away_team', 'category',
+        'competition_name', 'overall_prob', 'sub_type_id', 'prediction', 'bet_pick', 'odd',
+        'special_bet_value', 'outcome_id'
+    )
+    _casts = {'overall_prob': float, 'odd': float}  # tip sources store fractional values (e.g. an odd drop)
+
+
+class Match(Record):
+    """A row of the matches table."""
+    __slots__ = (
+        'match_id', 'kickoff', 'home_team', 'away_team', 'league', 'prediction', 'odd',
+        'home_results', 'status', 'away_results', 'overall_prob', 'sub_type_id',
+        'parent_match_id', 'bet_pick', 'outcome_id', 'special_bet_value'
+    )
+    _casts = {'overall_prob': int, 'sub_type_id': int, 'outcome_id': int}
+
+
+class Settlement(Record):
+    """A scored (and possibly settled) state of a prediction."""
+    __slots__ = ('match_id', 'home_score', 'away_score', 'status')
+
+
+class OddsMovement(Record):
+    """Price movement of one outcome over a window of odds_history."""
+    __slots__ = (
+        'parent_match_id', 'sub_type_id', 'outcome_id', 'special_bet_value',
+        'opening_odd', 'current_odd', 'changes', 'last_change'
+    )
+    _casts = {'opening_odd': float, 'current_odd': float}
+
+    @property
+    def change(self):
+        """Relative change from the opening price, negative when the odd is dropping."""
+        return (self.current_odd - self.opening_odd) / self.opening_odd if self.opening_odd else 0.0
+
+
+class FixtureMapping(Record):
+    """A provider fixture and the canonical fixture it resolves to (a row of fixture_map)."""
+    __slots__ = (
+        'provider', 'provider_fixture_id', 'fixture_key', 'home_team', 'away_team',
+        'kickoff', 'category', 'score'
+    )
+    _casts = {'provider_fixture_id': str, 'score': float}
+
+
+class ValueCandidate(Record):
+    """An outcome whose price at one book beats the overround-free consensus of the other books."""
+    __slots__ = (
+        'fixture_key', 'provider', 'parent_match_id', 'sub_type_id', 'outcome_id', 'special_bet_value',
+        'bet_pick', 'odd', 'probability', 'consensus_probability', 'books', 'edge'
+    )
+
+
+class JackpotTicket(Record):
+    """One ticket of a jackpot plan: covered outcomes ("1"/"X"/"2") by parent_match_id (a row of jackpot_tickets)."""
+    __slots__ = (
+        'provider', 'event_id', 'ticket_no', 'strategy', 'picks', 'lines', 'min_hits', 'hit_probability'
+    )
+    _casts = {'event_id': str, 'hit_probability': float}
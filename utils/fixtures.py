@@ -0,0 +1,185 @@
+import logging
+import re
+import threading
+from functools import lru_cache
+from typing import Dict, FrozenSet, Iterable, List, Optional, Tuple
+
+from unidecode import unidecode
+
+from utils.db import Db
+from utils.entities import FixtureMapping
+
+logger = logging.getLogger(__name__)
+
+TOKEN_PATTERN = re.compile(r"[^a-z0-9]+")
+# club-form words that carry no identity
+NOISE_TOKENS = frozenset({"fc", "cf", "sc", "afc", "ac", "fk", "sk", "cd", "ud", "sv", "bk", "if", "the", "club"})
+# spelling variants seen across providers -> canonical form, applied to the normalized name
+TEAM_ALIASES = {
+    "man utd": "manchester united",
+    "man united": "manchester united",
+    "man city": "manchester city",
+    "spurs": "tottenham hotspur",
+    "tottenham": "tottenham hotspur",
+    "wolves": "wolverhampton wanderers",
+    "psg": "paris saint germain",
+    "paris sg": "paris saint germain",
+    "inter": "inter milan",
+    "internazionale": "inter milan",
+    "bayern": "bayern munich",
+    "bayern munchen": "bayern munich",
+    "atl madrid": "atletico madrid",
+    "atl. madrid": "atletico madrid",
+    "sporting cp": "sporting lisbon",
+    "gor mahia fc": "gor mahia",
+}
+
+
+@lru_cache(maxsize=32768)
+def normalize_team(name: str) -> str:
+    """Canonical spelling of a team name: ascii, lowercase, no punctuation or club-form words, aliases applied."""
+    plain = unidecode(name or "").lower().strip()
+    if plain in TEAM_ALIASES:
+        return TEAM_ALIASES[plain]
+    tokens = [token for token in TOKEN_PATTERN.split(plain) if token and token not in NOISE_TOKENS]
+    joined = " ".join(tokens)
+    return TEAM_ALIASES.get(joined, joined)
+
+
+@lru_cache(maxsize=32768)
+def team_tokens(name: str) -> FrozenSet[str]:
+    """Word tokens of the normalized team name: "Atlético-Madrid/B" -> {"atletico", "madrid", "b"}."""
+    return frozenset(normalize_team(name).split())
+
+
+def sportradar_key(sr_id) -> Optional[str]:
+    """Canonical key of a Sportradar id ("sr:match:123" or 123), None if there is none."""
+    if sr_id in (None, "", "N/A"):
+        return None
+    return f"sr:{str(sr_id).replace('sr:match:', '')}"
+
+
+def fallback_key(home_team: str, away_team: str, kickoff) -> str:
+    """Canonical key of a fixture nobody has a Sportradar id for."""
+    return f"fx:{str(kickoff)[:10]}:{normalize_team(home_team)}:{normalize_team(away_team)}"
+
+
+class FixtureResolver:
+    """
+    Resolves provider fixture ids to canonical fixture keys, persisted in the fixture_map table.
+
+    Known ids are a cached dict lookup (one bulk query per batch for the rest). Fixtures carrying a Sportradar
+    id map to "sr:<id>" directly; the others are matched in bulk against the known fixtures of the same kickoff
+    date (blocking) by team-token similarity, and get a stable "fx:" key when nothing scores above `threshold`.
+    Fallback keys are returned but never stored, so a fixture keeps being matched until a counterpart shows up.
+    """
+    def __init__(self, db: Optional[Db] = None, threshold: float = 0.5):
+        self._db = db
+        self.threshold = threshold
+        self._keys: Dict[Tuple[str, str], str] = {}
+        self._pending: Dict[Tuple[str, str], FixtureMapping] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def db(self) -> Db:
+        if self._db is None:
+            self._db = Db()
+        return self._db
+
+    def lookup(self, provider: str, provider_fixture_id) -> Optional[str]:
+        return self.keys(provider, [provider_fixture_id]).get(str(provider_fixture_id))
+
+    def keys(self, provider: str, provider_fixture_ids: Iterable) -> Dict[str, str]:
+        """Known canonical key of each provider fixture id, in one bulk query for the ids not cached yet."""
+        ids = [str(i) for i in provider_fixture_ids]
+        missing = [i for i in ids if (provider, i) not in self._keys]
+        if missing:
+            self._keys.update({(provider, i): k for i, k in self.db.fetch_fixture_keys(provider, missing).items()})
+        return {i: self._keys[(provider, i)] for i in ids if (provider, i) in self._keys}
+
+    def link(self, mapping: FixtureMapping) -> None:
+        """Record a resolved mapping; written with the next `flush`."""
+        with self._lock:
+            key = (mapping.provider, str(mapping.provider_fixture_id))
+            if self._keys.get(key) != mapping.fixture_key:
+                self._keys[key] = mapping.fixture_key
+                self._pending[key] = mapping
+
+    @staticmethod
+    def similarity(a: FixtureMapping, b: FixtureMapping) -> float:
+        """Mean Jaccard similarity of home and away team tokens, 0 unless both sides share a token."""
+        scores = []
+        for left, right in ((a.home_team, b.home_team), (a.away_team, b.away_team)):
+            left, right = team_tokens(left), team_tokens(right)
+            shared = len(left & right)
+            if not shared:
+                return 0.0
+            scores.append(shared / len(left | right))
+        return sum(scores) / 2
+
+    def resolve(self, fixtures: Iterable[FixtureMapping]) -> List[str]:
+        """Canonical key of every fixture, in input order. `fixture_key` may be preset to "sr:<id>" by the caller."""
+        fixtures = list(fixtures)
+        by_provider: Dict[str, List[str]] = {}
+        for fixture in fixtures:
+            if (fixture.provider, fixture.provider_fixture_id) not in self._keys:
+                by_provider.setdefault(fixture.provider, []).append(fixture.provider_fixture_id)
+        for provider, ids in by_provider.items():
+            self._keys.update({(provider, i): k for i, k in self.db.fetch_fixture_keys(provider, ids).items()})
+
+        unresolved = []
+        for fixture in fixtures:
+            known = self._keys.get((fixture.provider, fixture.provider_fixture_id))
+            # a stored fallback key is retried: the fixture may have a cross-provider match by now
+            if known and not known.startswith("fx:"):
+                fixture.fixture_key = known
+            elif fixture.fixture_key:
+                fixture.score = 1.0
+                self.link(fixture)
+            else:
+                unresolved.append(fixture)
+
+        if unresolved:
+            self.match(unresolved, fixtures)
+        return [fixture.fixture_key for fixture in fixtures]
+
+    def match(self, unresolved: List[FixtureMapping], batch: List[FixtureMapping]) -> None:
+        """Blocking matcher: candidates share the kickoff date; best pair above `threshold` wins."""
+        dates = sorted({str(fixture.kickoff)[:10] for fixture in unresolved})
+        candidates = self.db.fetch_fixture_mappings(dates) + [fixture for fixture in batch if fixture.fixture_key]
+        # block on (kickoff date, home team token): only pairs sharing both are scored
+        blocks: Dict[Tuple[str, str], List[int]] = {}
+        for index, candidate in enumerate(candidates):
+            for token in team_tokens(candidate.home_team):
+                blocks.setdefault((str(candidate.kickoff)[:10], token), []).append(index)
+
+        matched = 0
+        for fixture in unresolved:
+            best, best_score = None, 0.0
+            date = str(fixture.kickoff)[:10]
+            indices = {index for token in team_tokens(fixture.home_team) for index in blocks.get((date, token), ())}
+            for candidate in (candidates[index] for index in sorted(indices)):
+                if candidate.provider == fixture.provider:
+                    continue
+                score = self.similarity(fixture, candidate)
+                if score > best_score:
+                    best, best_score = candidate, score
+            if best is not None and best_score >= self.threshold:
+                fixture.fixture_key, fixture.score = best.fixture_key, best_score
+                matched += 1
+                self.link(fixture)
+            else:
+                # fallback keys are not persisted, so the next batch tries to match the fixture again
+                fixture.fixture_key, fixture.score = fallback_key(fixture.home_team, fixture.away_team, fixture.kickoff), 0.0
+        logger.info("Matched %d of %d unmapped fixtures across providers", matched, len(unresolved))
+
+    def flush(self) -> bool:
+        """Persist the mappings resolved since the last flush in one bulk upsert."""
+        with self._lock:
+            pending, self._pending = list(self._pending.values()), {}
+        if self.db.upsert_fixture_mappings(pending):
+            return True
+        with self._lock:
+            for mapping in pending:
+                self._pending.setdefault((mapping.provider, str(mapping.provider_fixture_id)), mapping)
+        return False
@@ -8,18 +8,21 @@ import pytz
 import requests
 
 from utils.betika import Betika
+from utils.betika_sessions import BetikaSessions
 from utils.db import Db
-from utils.entities import Match
 
 
 logger = logging.getLogger(__name__)
 
 class Helper():   
     def __init__(self, phone=None, password=None):
-        self.betika = Betika()
         self.db = Db()
+        self.betika = None
         if phone and password:
-            self.betika.login(phone, password)
+            # cached session with a fresh balance; logs in only when no valid session exists
+            self.betika = BetikaSessions.instance().balance(phone, password)
+        if self.betika is None:
+            self.betika = Betika()
             
     def fetch_data(self, url, timeout=10):
         """
@@ -66,27 +69,7 @@ class Helper():
         return response.json()
 
     def fetch_matches(self, day, comparator='=', status="AND status IS NOT NULL", limit=16):
-        matches = []
-        for open_match in self.db.fetch_matches(day, comparator, status, limit):
-            match = Match()
-            match.match_id = open_match[0]
-            match.kickoff = open_match[1]
-            match.home_team = open_match[2]
-            match.away_team = open_match[3]
-            match.prediction = open_match[4]    
-            match.odd = open_match[5]    
-            match.home_results = open_match[6] 
-            match.status = open_match[7] 
-            match.away_results = open_match[8] 
-            match.overall_prob = int(open_match[9])   
-            match.sub_type_id = int(open_match[10])  
-            match.parent_match_id = open_match[11]
-            match.bet_pick = open_match[12]
-            match.outcome_id = int(open_match[13])
-            match.special_bet_value = open_match[14]
-            matches.append(match)
-            
-        return matches
+        return self.db.fetch_matches(day, comparator, status, limit)
     
     def get_upcoming_match_ids(self, live=False):    
         total = 1001
@@ -97,7 +80,7 @@ class Helper():
             total, page, events = self.betika.get_events(limit, page, live)
             
             for event in events:
-                parent_match_id = event.get('parent_match_id')
+                parent_match_id = event.parent_match_id
                 matches_ids.add(parent_match_id)
         
         return matches_ids
@@ -108,15 +91,15 @@ class Helper():
             total_odd = 1
             
             for match in matches:  
-                if not any(betslip["parent_match_id"] == match.get("parent_match_id") for betslip in betslips):
+                if not any(betslip["parent_match_id"] == match.parent_match_id for betslip in betslips):
                     betslip = {
-                        "sub_type_id": match.get("sub_type_id"),
-                        "bet_pick": match.get("bet_pick"),
-                        "odd_value": match.get("odd"),
-                        "outcome_id": match.get("outcome_id"),
+                        "sub_type_id": match.sub_type_id,
+                        "bet_pick": match.bet_pick,
+                        "odd_value": match.odd,
+                        "outcome_id": match.outcome_id,
                         "sport_id": 14,
-                        "special_bet_value": match.get("special_bet_value"),
-                        "parent_match_id": match.get("parent_match_id"),
+                        "special_bet_value": match.special_bet_value,
+                        "parent_match_id": match.parent_match_id,
                         "bet_type": 7
                     }
                     betslips.append(betslip)
@@ -0,0 +1,203 @@
+import heapq
+import logging
+import os
+import time
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from utils.entities import JackpotTicket
+
+logger = logging.getLogger(__name__)
+
+OUTCOMES = ("1", "X", "2")   # 1X2 outcome_id 1/2/3 -> column 0/1/2
+
+
+def at_least(q: np.ndarray, k: int) -> np.ndarray:
+    """P(at least k successes) of independent events with probabilities q (..., n): batched Poisson-binomial DP."""
+    q = np.asarray(q, dtype=float)
+    dist = np.zeros(q.shape[:-1] + (q.shape[-1] + 1,))
+    dist[..., 0] = 1.0
+    for i in range(q.shape[-1]):
+        qi = q[..., i:i + 1]
+        dist[..., 1:] = dist[..., 1:] * (1 - qi) + dist[..., :-1] * qi
+        dist[..., :1] *= 1 - qi
+    return dist[..., k:].sum(axis=-1)
+
+
+class JackpotOptimizer:
+    """
+    Ticket plans for a jackpot from per-match 1X2 probabilities, for hitting at least `min_hits` of n.
+
+    Two plans are built within `budget` lines (single combinations) and the more likely one is kept:
+    - a system ticket: doubles/trebles added greedily, best gain in log P(>= k) per log cost first. Covered
+      matches are independent, so every candidate upgrade is scored exactly in one batched Poisson-binomial DP;
+    - a reduced system: single lines chosen by lazy greedy max-coverage over `simulations` simulated results.
+      Candidates are the modal line, its one/two-outcome deviations and sampled lines. A line's marginal
+      coverage only shrinks, so stale heap bounds prune most re-evaluations, and selection stops when no line
+      adds coverage (fewer tickets than the budget). Its probability is measured on a second, independent draw.
+    """
+    def __init__(self, budget: int = int(os.getenv('JACKPOT_TICKET_BUDGET', '32')),
+                 allowed_misses: int = int(os.getenv('JACKPOT_ALLOWED_MISSES', '2')),
+                 simulations: int = int(os.getenv('JACKPOT_SIMULATIONS', '20000')),
+                 seed: Optional[int] = None):
+        self.budget = budget
+        self.allowed_misses = allowed_misses
+        self.simulations = simulations
+        self.seed = seed
+
+    @staticmethod
+    def probabilities(picks: List[Optional[Dict]], matches: List[Dict]) -> np.ndarray:
+        """
+        n × 3 matrix of 1X2 probabilities. The base is the overround-free price when the jackpot quotes all
+        three odds, else uniform; a 1X2 pick's overall_prob replaces its outcome and the rest is spread by base.
+        """
+        probabilities = np.full((len(matches), 3), 1 / 3)
+        for row, (pick, match_details) in enumerate(zip(picks, matches)):
+            prices = {}
+            for market in match_details.get('odds') or []:
+                try:
+                    if int(market['sub_type_id']) == 1 and float(market.get('odd_value') or 0) > 1:
+                        prices[int(market['outcome_id'])] = float(market['odd_value'])
+                except (KeyError, TypeError, ValueError):
+                    continue
+            if len(prices) == 3:
+                implied = np.array([1 / prices[outcome_id] for outcome_id in (1, 2, 3)])
+                probabilities[row] = implied / implied.sum()
+
+            try:
+                if pick and int(pick['sub_type_id']) == 1 and int(pick['outcome_id']) in (1, 2, 3) and pick.get('overall_prob'):
+                    column = int(pick['outcome_id']) - 1
+                    p = min(max(float(pick['overall_prob']) / 100, 0.01), 0.99)
+                    others = np.delete(probabilities[row], column)
+                    probabilities[row] = np.insert(others / others.sum() * (1 - p), column, p)
+            except (KeyError, TypeError, ValueError):
+                continue
+        return probabilities
+
+    def simulate(self, probabilities: np.ndarray, rng: np.random.Generator) -> np.ndarray:
+        """Simulated results, simulations × n outcome columns."""
+        cumulative = np.cumsum(probabilities, axis=1)
+        return (rng.random((self.simulations, len(probabilities), 1)) > cumulative[None, :, :-1]).sum(axis=2)
+
+    def system_ticket(self, probabilities: np.ndarray, min_hits: int) -> Tuple[np.ndarray, float]:
+        """Cover matrix (n × 3 bool) of the best single system ticket within budget, and its exact P(>= min_hits)."""
+        n = len(probabilities)
+        ranked = np.argsort(-probabilities, axis=1)                    # outcomes of each match, most likely first
+        covered = np.ones(n, dtype=int)                                 # outcomes covered per match
+        rows = np.arange(n)
+        sorted_probabilities = np.take_along_axis(probabilities, ranked, axis=1)
+        cumulative = np.cumsum(sorted_probabilities, axis=1)
+
+        q = cumulative[rows, covered - 1]
+        current = float(at_least(q, min_hits))
+        lines = 1
+        while True:
+            upgradable = np.flatnonzero((covered < 3) & (lines // covered * (covered + 1) <= self.budget))
+            if not len(upgradable):
+                break
+            # one candidate per upgradable match: its next most likely outcome added
+            candidates = np.repeat(q[None, :], len(upgradable), axis=0)
+            candidates[np.arange(len(upgradable)), upgradable] = cumulative[upgradable, covered[upgradable]]
+            gains = np.log(np.maximum(at_least(candidates, min_hits), 1e-300)) - np.log(max(current, 1e-300))
+            gains /= np.log((covered[upgradable] + 1) / covered[upgradable])
+            best = int(np.argmax(gains))
+            if gains[best] <= 0:
+                break
+            match = upgradable[best]
+            lines = lines // covered[match] * (covered[match] + 1)
+            covered[match] += 1
+            q = candidates[best]
+            current = float(at_least(q, min_hits))
+
+        cover = np.zeros((n, 3), dtype=bool)
+        for match in range(n):
+            cover[match, ranked[match, :covered[match]]] = True
+        return cover, current
+
+    def reduced_system(self, probabilities: np.ndarray, min_hits: int, rng: np.random.Generator) -> Tuple[List[np.ndarray], float]:
+        """Single lines (outcome column per match) maximising the simulated P(some line has >= min_hits)."""
+        n = len(probabilities)
+        results = self.simulate(probabilities, rng)
+
+        modal = np.argmax(probabilities, axis=1)
+        candidates = [modal[None, :]]
+        # the modal line with one or two matches switched to their second most likely outcome
+        second = np.argsort(-probabilities, axis=1)[:, 1]
+        singles = np.repeat(modal[None, :], n, axis=0)
+        singles[np.arange(n), np.arange(n)] = second
+        i, j = np.triu_indices(n, 1)
+        doubles = np.repeat(modal[None, :], len(i), axis=0)
+        doubles[np.arange(len(i)), i] = second[i]
+        doubles[np.arange(len(i)), j] = second[j]
+        candidates += [singles, doubles, results[:min(len(results), 2000)]]
+        lines = np.unique(np.concatenate(candidates), axis=0)
+
+        # hits of every candidate line in every simulation, lines × simulations
+        one_hot = np.eye(3, dtype=np.float32)[results].reshape(self.simulations, n * 3)
+        line_cover = np.eye(3, dtype=np.float32)[lines].reshape(len(lines), n * 3)
+        hits = (line_cover @ one_hot.T) >= min_hits
+
+        uncovered = np.ones(self.simulations, dtype=bool)
+        heap = [(-int(count), index) for index, count in enumerate(hits.sum(axis=1)) if count]
+        heapq.heapify(heap)
+        chosen = []
+        while heap and len(chosen) < self.budget:
+            _, index = heapq.heappop(heap)
+            gain = int(np.count_nonzero(hits[index] & uncovered))
+            if not gain:
+                continue
+            if heap and gain < -heap[0][0]:
+                heapq.heappush(heap, (-gain, index))   # stale bound: re-queue with the exact gain
+                continue
+            chosen.append(lines[index])
+            uncovered &= ~hits[index]
+        if not chosen:
+            return [], 0.0
+
+        # scored on fresh results: the selection draws overstate the coverage they were chosen for
+        holdout = np.eye(3, dtype=np.float32)[self.simulate(probabilities, rng)].reshape(self.simulations, n * 3)
+        chosen_cover = np.eye(3, dtype=np.float32)[np.array(chosen)].reshape(len(chosen), n * 3)
+        return chosen, float(((chosen_cover @ holdout.T) >= min_hits).any(axis=0).mean())
+
+    def optimize(self, picks: List[Optional[Dict]], matches: List[Dict], provider: str = None, event_id=None) -> List[JackpotTicket]:
+        """Tickets of the better plan for a jackpot; `picks[i]` is the stored pick of `matches[i]` (or None)."""
+        if not matches:
+            return []
+        started = time.perf_counter()
+        rng = np.random.default_rng(self.seed)
+        probabilities = self.probabilities(picks, matches)
+        min_hits = max(1, len(matches) - self.allowed_misses)
+
+        cover, system_probability = self.system_ticket(probabilities, min_hits)
+        reduced, reduced_probability = self.reduced_system(probabilities, min_hits, rng)
+        parent_match_ids = [str(match_details['parent_match_id']) for match_details in matches]
+
+        if system_probability >= reduced_probability or not reduced:
+            tickets = [JackpotTicket(
+                provider=provider, event_id=str(event_id), ticket_no=1, strategy="system",
+                picks={pmid: [OUTCOMES[c] for c in np.flatnonzero(row)] for pmid, row in zip(parent_match_ids, cover)},
+                lines=int(cover.sum(axis=1).prod()), min_hits=min_hits, hit_probability=round(system_probability, 6)
+            )]
+        else:
+            tickets = [
+                JackpotTicket(
+                    provider=provider, event_id=str(event_id), ticket_no=number, strategy="reduced",
+                    picks={pmid: [OUTCOMES[c]] for pmid, c in zip(parent_match_ids, line)},
+                    lines=1, min_hits=min_hits, hit_probability=round(float(reduced_probability), 6)
+                )
+                for number, line in enumerate(reduced, start=1)
+            ]
+        logger.info("Jackpot %s %s: %s plan, %d tickets, P(>=%d of %d) %.4f (system %.4f, reduced %.4f) in %.2fs",
+                    provider, event_id, tickets[0].strategy, len(tickets), min_hits, len(matches),
+                    tickets[0].hit_probability, system_probability, reduced_probability, time.perf_counter() - started)
+        return tickets
+
+
+if __name__ == "__main__":
+    rng = np.random.default_rng(0)
+    sample = [{"parent_match_id": i, "odds": []} for i in range(17)]
+    sample_picks = [{"sub_type_id": 1, "outcome_id": int(rng.integers(1, 4)), "overall_prob": int(rng.integers(45, 80))} for _ in range(17)]
+    started = time.perf_counter()
+    plan = JackpotOptimizer(seed=0).optimize(sample_picks, sample, "sample", 1)
+    print(f"{len(plan)} {plan[0].strategy} tickets, P={plan[0].hit_probability} in {time.perf_counter() - started:.2f}s")
@@ -0,0 +1,82 @@
+import logging
+import threading
+from concurrent.futures import Future
+from typing import Dict, Iterable, List
+
+from utils.betika import Betika
+from utils.entities import Match
+from utils.odds_matrix import OddsMatrix
+
+logger = logging.getLogger(__name__)
+
+
+class MarketSnapshot:
+    """
+    Betika markets of one run, shared by all profile threads.
+
+    Each fixture's match details are fetched once per snapshot, concurrently on the shared loop; a thread asking
+    for fixtures another thread is already fetching waits for that fetch instead of repeating it.
+    Current odds and availability are then read per (parent_match_id, sub_type_id, bet_pick).
+    """
+    def __init__(self, betika: Betika):
+        self.betika = betika
+        self.odds_matrix = OddsMatrix()
+        self._fetches: Dict[int, Future] = {}
+        self._lock = threading.Lock()
+
+    async def _fetch_all(self, parent_match_ids: List[int]) -> list:
+        return await self.betika.http.gather(*(
+            self.betika.get_data_async(f'{self.betika.base_url}/v1/uo/match?parent_match_id={parent_match_id}')
+            for parent_match_id in parent_match_ids
+        ))
+
+    def ensure(self, parent_match_ids: Iterable) -> None:
+        """Fetch the fixtures not yet in the snapshot and wait for the ones being fetched by other threads."""
+        owned, waiting = [], []
+        with self._lock:
+            for parent_match_id in {int(parent_match_id) for parent_match_id in parent_match_ids}:
+                future = self._fetches.get(parent_match_id)
+                if future is None:
+                    future = self._fetches[parent_match_id] = Future()
+                    owned.append(parent_match_id)
+                waiting.append(future)
+
+        if owned:
+            logger.info("Fetching markets of %d fixtures for the snapshot", len(owned))
+            try:
+                all_details = self.betika.http.run(self._fetch_all(owned))
+                with self._lock:
+                    for parent_match_id, match_details in zip(owned, all_details):
+                        available = bool(match_details) and not isinstance(match_details, Exception)
+                        if available:
+                            self.odds_matrix.add_match_details(match_details)
+                        self._fetches[parent_match_id].set_result(available)
+            except Exception as e:
+                logger.error("Error fetching markets: %s", e)
+            finally:
+                for parent_match_id in owned:
+                    if not self._fetches[parent_match_id].done():
+                        self._fetches[parent_match_id].set_result(False)
+
+        for future in waiting:
+            future.result()
+
+    def lookup(self, parent_match_id, sub_type_id, bet_pick):
+        """Current odd of a pick, None if the market/outcome is not offered."""
+        with self._lock:
+            return self.odds_matrix.lookup(parent_match_id, sub_type_id, bet_pick)
+
+    def available(self, matches: List[Match]) -> List[Match]:
+        """The matches whose pick is still offered, with their odd updated to the current price."""
+        self.ensure(match.parent_match_id for match in matches)
+        available = []
+        for match in matches:
+            try:
+                odd = self.lookup(match.parent_match_id, match.sub_type_id, match.bet_pick)
+            except (TypeError, ValueError) as e:
+                logger.error("Invalid pick %s: %s", match, e)
+                continue
+            if odd:
+                match.odd = odd
+                available.append(match)
+        return available
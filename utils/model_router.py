@@ -0,0 +1,67 @@
+import logging
+import os
+import threading
+import time
+from typing import Optional, Tuple
+
+from dotenv import load_dotenv
+
+from utils.gemini import Gemini
+from utils.github_models import GithubModels
+
+logger = logging.getLogger(__name__)
+
+
+class RateLimiter:
+    """Thread-safe request spacing: at most `per_minute` calls start per minute, callers wait for their slot."""
+    def __init__(self, per_minute: float):
+        self.interval = 60.0 / per_minute if per_minute > 0 else 0.0
+        self._next = 0.0
+        self._lock = threading.Lock()
+
+    def acquire(self) -> None:
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next)
+            self._next = slot + self.interval
+        if slot > now:
+            time.sleep(slot - now)
+
+
+class ModelRouter:
+    """
+    LLM providers behind process-wide rate limits, shared by every prediction task.
+
+    GitHub Models is tried first, Gemini when it gives no answer. The limiters are class attributes, so
+    concurrent callers (pipeline workers, jackpot threads, overlapping tasks) queue for slots instead of each
+    sleeping after its own calls. Clients stay per instance, so every run starts with all accounts again.
+    """
+    github_limiter: Optional[RateLimiter] = None
+    gemini_limiter: Optional[RateLimiter] = None
+    _limiters_lock = threading.Lock()
+
+    def __init__(self):
+        load_dotenv()
+        # created by the first router, not at import, so limits set in .env apply
+        with ModelRouter._limiters_lock:
+            if ModelRouter.github_limiter is None:
+                ModelRouter.github_limiter = RateLimiter(float(os.getenv('GITHUB_MODELS_RPM', '10')))
+                ModelRouter.gemini_limiter = RateLimiter(float(os.getenv('GEMINI_RPM', '2')))
+        self.github_models = GithubModels()
+        self.gemini = Gemini()
+
+    @staticmethod
+    def _ask(client, limiter: RateLimiter, query: str) -> Tuple[Optional[str], Optional[str]]:
+        limiter.acquire()
+        try:
+            return client.get_response(query)
+        except Exception as e:
+            # the clients drop exhausted models/accounts from shared lists, which can race between threads
+            logger.error("Error in %s: %s", type(client).__name__, e)
+            return None, None
+
+    def get_response(self, query: str) -> Tuple[Optional[str], Optional[str]]:
+        response, model = self._ask(self.github_models, self.github_limiter, query)
+        if not response:
+            response, model = self._ask(self.gemini, self.gemini_limiter, query)
+        return response, model
@@ -13,7 +13,7 @@ class Base(DeclarativeBase):
     pass
 
 
-class Match(Base):
+class MatchModel(Base):
     __tablename__ = "matches"
 
     match_id: Mapped[str] = mapped_column(String, primary_key=True)
@@ -99,3 +99,15 @@ class Event(Base):
     home_results: Mapped[Optional[int]] = mapped_column(Integer, nullable=True)
     away_results: Mapped[Optional[int]] = mapped_column(Integer, nullable=True)
     status: Mapped[Optional[str]] = mapped_column(String, nullable=True)
+
+
+class OddsHistory(Base):
+    __tablename__ = "odds_history"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+    parent_match_id: Mapped[int] = mapped_column(Integer, nullable=False)
+    sub_type_id: Mapped[int] = mapped_column(Integer, nullable=False)
+    outcome_id: Mapped[int] = mapped_column(Integer, nullable=False)
+    special_bet_value: Mapped[Optional[str]] = mapped_column(String, nullable=True)
+    odd_value: Mapped[float] = mapped_column(Float, nullable=False)
+    recorded_at: Mapped[datetime] = mapped_column(DateTime, nullable=False)
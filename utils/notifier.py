@@ -0,0 +1,103 @@
+import atexit
+import logging
+import os
+import queue
+import threading
+import time
+from typing import List, Optional, Tuple
+
+from utils.one_signal import OneSignal
+
+logger = logging.getLogger(__name__)
+
+_STOP = object()
+
+
+class Notifier:
+    """
+    Background dispatcher for "prediction WON" pushes.
+
+    Callers only enqueue, so a results tick never waits on OneSignal. The dispatcher thread merges the wins
+    that arrive within `window` seconds into one digest push, keeps at least `min_interval` seconds between
+    pushes, and announces each match at most once per process. Pending wins are flushed at exit.
+    """
+    _instance = None
+    _instance_lock = threading.Lock()
+
+    def __init__(self, one_signal: Optional[OneSignal] = None,
+                 window: float = float(os.getenv('NOTIFY_DIGEST_SECONDS', '10')),
+                 min_interval: float = float(os.getenv('NOTIFY_MIN_INTERVAL', '30'))):
+        self.one_signal = one_signal or OneSignal()
+        self.window = window
+        self.min_interval = min_interval
+        self.image = "https://tipspesa.vercel.app/static/prediction-won.jpg"
+        self.queue: queue.Queue = queue.Queue()
+        self._announced = set()
+        self._announced_lock = threading.Lock()
+        self._last_sent = 0.0
+        self._thread = threading.Thread(target=self._run, name="notifier", daemon=True)
+        self._thread.start()
+
+    @classmethod
+    def instance(cls) -> "Notifier":
+        with cls._instance_lock:
+            if cls._instance is None:
+                cls._instance = cls()
+                atexit.register(cls._instance.close)
+            return cls._instance
+
+    def won(self, match_id, message: str) -> bool:
+        """Queue a win announcement. Returns False if the match was already announced."""
+        with self._announced_lock:
+            if match_id in self._announced:
+                return False
+            self._announced.add(match_id)
+        self.queue.put((match_id, message))
+        return True
+
+    def _collect(self, first) -> Tuple[List[tuple], bool]:
+        """Gather everything that arrives until the digest window (and rate limit) has passed."""
+        batch, stopped = [first], False
+        deadline = max(time.monotonic() + self.window, self._last_sent + self.min_interval)
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                item = self.queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if item is _STOP:
+                stopped = True
+                break
+            batch.append(item)
+        return batch, stopped
+
+    def _send(self, batch: List[tuple]) -> None:
+        if len(batch) == 1:
+            heading = "🎉🎉 Predicted Match WON!!! 🎉🎉"
+        else:
+            heading = f"🎉🎉 {len(batch)} Predicted Matches WON!!! 🎉🎉"
+        message = "\n".join(message for _, message in batch)
+        logger.info("Sending Notification to app users for %d won matches", len(batch))
+        self.one_signal.send_push_notification(heading=heading, message=message, image=self.image)
+        self._last_sent = time.monotonic()
+
+    def _run(self) -> None:
+        while True:
+            item = self.queue.get()
+            if item is _STOP:
+                return
+            batch, stopped = self._collect(item)
+            try:
+                self._send(batch)
+            except Exception as e:
+                logger.error("Error sending notification: %s", e)
+            if stopped:
+                return
+
+    def close(self, timeout: float = 10) -> None:
+        """Flush pending wins and stop the dispatcher."""
+        if self._thread.is_alive():
+            self.queue.put(_STOP)
+            self._thread.join(timeout)
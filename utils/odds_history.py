@@ -0,0 +1,64 @@
+import logging
+import threading
+from datetime import datetime
+from typing import List, Optional
+
+from utils.db import Db
+from utils.entities import OddsMovement
+from utils.odds_matrix import OddsMatrix
+
+logger = logging.getLogger(__name__)
+
+
+class OddsHistory:
+    """
+    Append-only odds time series on top of the odds_history table.
+
+    Prices are delta encoded: a sync only writes the outcomes whose price differs from the last recorded one,
+    so price movement (and dropping odds) can be read from our own history instead of asking upstream per event.
+    """
+    def __init__(self, db: Optional[Db] = None):
+        self.db = db or Db()
+        self._last_prices = None
+        self._lock = threading.Lock()
+
+    def record(self, odds_matrix: OddsMatrix, recorded_at: Optional[datetime] = None) -> int:
+        """Store the changed prices of `odds_matrix`. Returns the number of rows written."""
+        if not len(odds_matrix):
+            return 0
+
+        recorded_at = recorded_at or datetime.now()
+        arrays = odds_matrix.arrays
+        with self._lock:
+            if self._last_prices is None:
+                self._last_prices = self.db.fetch_latest_odds()
+
+            rows = []
+            for parent_match_id, sub_type_id, outcome_id, line, odd in zip(
+                arrays['parent_match_id'].tolist(),
+                arrays['sub_type_id'].tolist(),
+                arrays['outcome_id'].tolist(),
+                arrays['line'].tolist(),
+                arrays['odd'].tolist()
+            ):
+                key = (parent_match_id, sub_type_id, outcome_id, odds_matrix.lines[line])
+                if self._last_prices.get(key) != odd:
+                    rows.append((*key, odd, recorded_at))
+
+            if not self.db.copy_odds_history(rows):
+                return 0
+            self._last_prices.update({row[:4]: row[4] for row in rows})
+
+        logger.info("Recorded %d of %d prices in odds history", len(rows), len(odds_matrix))
+        return len(rows)
+
+    def movements(self, hours: int = 24) -> List[OddsMovement]:
+        return self.db.fetch_odds_movements(hours)
+
+    def dropping_odds(self, hours: int = 24, min_drop: float = 0.05, sub_type_ids=(1,)) -> List[OddsMovement]:
+        """Outcomes whose price fell by at least `min_drop` (relative) over the window, biggest drop first."""
+        dropping = [
+            movement for movement in self.movements(hours)
+            if movement.sub_type_id in sub_type_ids and movement.change <= -min_drop
+        ]
+        return sorted(dropping, key=lambda movement: movement.change)
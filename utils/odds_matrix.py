@@ -0,0 +1,195 @@
+import logging
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+class OddsMatrix:
+    """
+    Array-backed odds for many fixtures: one entry per fixture × (sub_type_id, outcome_id, special_bet_value).
+
+    Entries are appended from Betika detail/listing payloads and frozen into NumPy columns on first use,
+    so screening questions ("every outcome priced in [1.15, 1.30] except away wins") are one vectorized pass
+    over all fixtures instead of nested loops over each payload.
+    """
+    def __init__(self):
+        self.fixture_ids: List[int] = []           # row -> parent_match_id
+        self.lines: List[str] = []                 # line code -> special_bet_value
+        self.odd_keys: List[str] = []              # entry -> odd_key (display value of the outcome)
+        self.market_names: List[str] = []          # entry -> market name e.g. "TOTAL"
+        self._fixture_index: Dict[int, int] = {}
+        self._line_index: Dict[str, int] = {}
+        self._entry_index: Dict[tuple, int] = {}   # (row, sub_type_id, outcome_id, line) -> entry
+        self._pick_index: Dict[tuple, int] = {}    # (parent_match_id, sub_type_id, odd_key) -> entry
+        self._fixture, self._sub_type, self._outcome, self._line, self._odd = [], [], [], [], []
+        self._arrays = None
+
+    def __len__(self):
+        return len(self._odd)
+
+    def _code(self, index: dict, labels: list, value) -> int:
+        code = index.get(value)
+        if code is None:
+            code = index[value] = len(labels)
+            labels.append(value)
+        return code
+
+    def add(self, parent_match_id, sub_type_id, outcome_id, odd_value, special_bet_value='', odd_key=None, market_name=None) -> None:
+        """Insert or update one priced outcome."""
+        # malformed entries (non-numeric ids or price) are skipped before anything is indexed
+        try:
+            odd = float(odd_value)
+            parent_match_id, sub_type_id, outcome_id = int(parent_match_id), int(sub_type_id), int(outcome_id)
+        except (TypeError, ValueError):
+            return
+        if odd <= 1:
+            return
+
+        row = self._code(self._fixture_index, self.fixture_ids, parent_match_id)
+        line = self._code(self._line_index, self.lines, special_bet_value or '')
+        key = (row, sub_type_id, outcome_id, line)
+
+        entry = self._entry_index.get(key)
+        if entry is None:
+            entry = self._entry_index[key] = len(self._odd)
+            self._fixture.append(row)
+            self._sub_type.append(key[1])
+            self._outcome.append(key[2])
+            self._line.append(line)
+            self._odd.append(odd)
+            self.odd_keys.append(odd_key)
+            self.market_names.append(market_name)
+        else:
+            self._odd[entry] = odd
+            self.odd_keys[entry] = odd_key
+            self.market_names[entry] = market_name
+
+        if odd_key is not None:
+            self._pick_index[(parent_match_id, key[1], odd_key)] = entry
+        self._arrays = None
+
+    def add_match_details(self, match_details: dict) -> None:
+        """Fill from a Betika /v1/uo/match payload."""
+        if not match_details:
+            return
+        parent_match_id = (match_details.get('meta') or {}).get('parent_match_id')
+        if parent_match_id is None:
+            return
+        for datum in match_details.get('data', []):
+            for odd in datum.get('odds', []):
+                self.add(
+                    parent_match_id,
+                    datum.get('sub_type_id'),
+                    odd.get('outcome_id'),
+                    odd.get('odd_value'),
+                    special_bet_value=odd.get('special_bet_value'),
+                    odd_key=odd.get('odd_key'),
+                    market_name=datum.get('name')
+                )
+
+    def add_listing(self, fixtures: Iterable) -> None:
+        """Fill the 1X2 market from listing Fixtures (home_odd / neutral_odd / away_odd)."""
+        for fixture in fixtures:
+            for outcome_id, odd_key, odd in (
+                (1, fixture.home_team, fixture.home_odd),
+                (2, 'draw', fixture.neutral_odd),
+                (3, fixture.away_team, fixture.away_odd)
+            ):
+                if odd:
+                    self.add(fixture.parent_match_id, 1, outcome_id, odd, odd_key=odd_key, market_name='1X2')
+
+    @property
+    def arrays(self) -> Dict[str, np.ndarray]:
+        """Column arrays, rebuilt lazily after inserts."""
+        if self._arrays is None:
+            fixture = np.asarray(self._fixture, dtype=np.int64)
+            sub_type = np.asarray(self._sub_type, dtype=np.int64)
+            line = np.asarray(self._line, dtype=np.int64)
+            odd = np.asarray(self._odd, dtype=np.float64)
+
+            # market = one (fixture, sub_type_id, special_bet_value) group, used to remove the overround
+            market = np.unique(np.stack([fixture, sub_type, line], axis=1), axis=0, return_inverse=True)[1].reshape(-1) \
+                if len(odd) else np.zeros(0, dtype=np.int64)
+            implied = 1.0 / odd if len(odd) else np.zeros(0)
+            overround = np.bincount(market, weights=implied)[market] if len(odd) else np.zeros(0)
+
+            self._arrays = {
+                'fixture': fixture,
+                'parent_match_id': np.asarray(self.fixture_ids, dtype=np.int64)[fixture] if len(odd) else fixture,
+                'sub_type_id': sub_type,
+                'outcome_id': np.asarray(self._outcome, dtype=np.int64),
+                'line': line,
+                'odd': odd,
+                'market': market,
+                'implied': implied,
+                'overround': overround,
+                'fair': implied / np.where(overround > 0, overround, 1.0)
+            }
+        return self._arrays
+
+    def implied_probabilities(self) -> np.ndarray:
+        return self.arrays['implied']
+
+    def fair_probabilities(self) -> np.ndarray:
+        """Implied probabilities normalised so each market sums to 1 (proportional overround removal)."""
+        return self.arrays['fair']
+
+    def select(self, min_odd: Optional[float] = None, max_odd: Optional[float] = None, sub_type_ids: Optional[Iterable[int]] = None,
+               exclude_outcome_ids: Optional[Iterable[int]] = None, min_probability: Optional[float] = None,
+               parent_match_ids: Optional[Iterable[int]] = None) -> np.ndarray:
+        """Indices of the entries matching every given condition."""
+        a = self.arrays
+        mask = np.ones(len(a['odd']), dtype=bool)
+        if min_odd is not None:
+            mask &= a['odd'] >= min_odd
+        if max_odd is not None:
+            mask &= a['odd'] <= max_odd
+        if sub_type_ids is not None:
+            mask &= np.isin(a['sub_type_id'], list(sub_type_ids))
+        if exclude_outcome_ids is not None:
+            mask &= ~np.isin(a['outcome_id'], list(exclude_outcome_ids))
+        if min_probability is not None:
+            mask &= a['fair'] >= min_probability
+        if parent_match_ids is not None:
+            mask &= np.isin(a['parent_match_id'], list(parent_match_ids))
+        return np.flatnonzero(mask)
+
+    def entry(self, index: int) -> dict:
+        a = self.arrays
+        return {
+            "parent_match_id": int(a['parent_match_id'][index]),
+            "sub_type_id": int(a['sub_type_id'][index]),
+            "prediction": self.market_names[index],
+            "odd_key": self.odd_keys[index],
+            "odd_value": float(a['odd'][index]),
+            "special_bet_value": self.lines[a['line'][index]],
+            "outcome_id": int(a['outcome_id'][index]),
+            "fair_probability": float(a['fair'][index])
+        }
+
+    def entries(self, indices: Iterable[int]) -> List[dict]:
+        return [self.entry(index) for index in indices]
+
+    def lookup(self, parent_match_id, sub_type_id, odd_key) -> Optional[float]:
+        """Current odd of a pick, or None if the market/outcome is not offered."""
+        entry = self._pick_index.get((int(parent_match_id), int(sub_type_id), odd_key))
+        return self._odd[entry] if entry is not None else None
+
+    def markets(self, parent_match_id, sub_type_ids: Iterable[int]) -> List[dict]:
+        """Markets of one fixture grouped like the Betika payload: [{sub_type_id, prediction, odds: [...]}, ...]"""
+        grouped = {}
+        for index in self.select(sub_type_ids=sub_type_ids, parent_match_ids=[int(parent_match_id)]):
+            entry = self.entry(index)
+            market = grouped.setdefault(
+                (entry['sub_type_id'], entry['prediction']),
+                {"sub_type_id": entry['sub_type_id'], "prediction": entry['prediction'], "odds": []}
+            )
+            market["odds"].append({
+                "odd_key": entry['odd_key'],
+                "odd_value": entry['odd_value'],
+                "special_bet_value": entry['special_bet_value'],
+                "outcome_id": entry['outcome_id']
+            })
+        return list(grouped.values())
@@ -1,25 +1,60 @@
 
+import asyncio
 from datetime import datetime
 import json
 import logging
 import os
-import requests
+import aiohttp
 from dotenv import load_dotenv
 
+from utils.async_http import AsyncHttp
+from utils.subscribers import SubscriberCache
+
 
 logger = logging.getLogger(__name__)
 
+SEGMENTS = [
+    "Active Subscriptions", #Session within the last 7 days
+    "Engaged Subscriptions", #4+ Sessions within the last 7 days
+]
+
 class OneSignal():
     def __init__(self):
         load_dotenv()        
         self.base_url = "https://api.onesignal.com"
+        self.http = AsyncHttp.instance()
+        self.subscribers = SubscriberCache.instance()
+        self.chunk_size = int(os.getenv('ONE_SIGNAL_CHUNK_SIZE', '20000'))  # OneSignal caps include_aliases per request
+        self.target = os.getenv('ONE_SIGNAL_TARGET', 'subscribers')  # subscribers: active subscribers by external_id, segments: active/engaged segments
         self.headers = {
             "content-type": "application/json; charset=utf-8",
             "authorization": f"Key {os.getenv('ONE_SIGNAL_API_KEY')}"
         }     
          
-    def send_push_notification(self, heading, message, image):
-        logger.info('sending push notification... %s', message)
+    def send_push_notification(self, heading, message, image, external_ids=None):
+        return self.http.run(self.send_push_notification_async(heading, message, image, external_ids))
+
+    async def send_push_notification_async(self, heading, message, image, external_ids=None):
+        """
+        Push to the given external ids, by default every paying subscriber, in chunks of `chunk_size`; nothing is sent
+        without an id. ONE_SIGNAL_TARGET=segments pushes to the active and engaged segments instead.
+        """
+        if external_ids is None and self.target == 'segments':
+            logger.info('sending push notification to segments... %s', message)
+            return [await self._send_async(heading, message, image, {"included_segments": SEGMENTS})]
+        if external_ids is None:
+            external_ids = await asyncio.to_thread(self.subscribers.active)
+        if not external_ids:
+            logger.info('No active subscribers to notify, skipping push: %s', message)
+            return []
+
+        chunks = [external_ids[i:i + self.chunk_size] for i in range(0, len(external_ids), self.chunk_size)]
+        logger.info('sending push notification to %d subscribers in %d chunks... %s', len(external_ids), len(chunks), message)
+        return await self.http.gather(*(
+            self._send_async(heading, message, image, {"include_aliases": {"external_id": chunk}}) for chunk in chunks
+        ))
+
+    async def _send_async(self, heading, message, image, audience):
         try:
             url = f"{self.base_url}/notifications"
             payload ={
@@ -33,29 +68,26 @@ class OneSignal():
                     "en": message
                 },
                 "big_picture": image,
-                "included_segments": [
-                    "Active Subscriptions", #Session within the last 7 days
-                    "Engaged Subscriptions", #4+ Sessions within the last 7 days
-                    "Inactive Subscriptions", #No Session within the last 7 days
-                    "Total Subscriptions"
-                ],
+                **audience,
             }
             # Sending the POST request
-            response = requests.post(
+            response = await self.http.request(
+                "POST",
                 url,                 
                 headers=self.headers,
-                data=json.dumps(payload)
+                data=json.dumps(payload),
+                timeout=30
             )
             logger.info(response.json())
             return response.json()
         
-        except requests.exceptions.HTTPError as http_err:
+        except aiohttp.ClientResponseError as http_err:
             logger.error("HTTP error occurred: %s", http_err)
-        except requests.exceptions.ConnectionError as conn_err:
+        except aiohttp.ClientConnectionError as conn_err:
             logger.error("Connection error occurred: %s", conn_err)
-        except requests.exceptions.Timeout as timeout_err:
+        except asyncio.TimeoutError as timeout_err:
             logger.error("Timeout error occurred: %s", timeout_err)
-        except requests.exceptions.RequestException as req_err:
+        except aiohttp.ClientError as req_err:
             logger.error("An error occurred: %s", req_err)
         except Exception as err:
             logger.error("Unexpected error: %s", err)
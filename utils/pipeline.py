@@ -0,0 +1,92 @@
+import logging
+import queue
+import threading
+from typing import Any, Callable, Iterable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+_DONE = object()  # end-of-stream marker passed from stage to stage
+
+
+class Stage:
+    """
+    One step of a Pipeline.
+
+    `fn` receives an item and returns the item for the next stage, or None to drop it.
+    `workers` threads run `fn` concurrently; `maxsize` bounds the input queue so a slow
+    stage applies backpressure to the stages feeding it.
+    """
+    def __init__(self, name: str, fn: Callable[[Any], Any], workers: int = 1, maxsize: int = 16):
+        self.name = name
+        self.fn = fn
+        self.workers = max(1, workers)
+        self.maxsize = max(1, maxsize)
+
+
+class Pipeline:
+    """
+    Streams items from a source iterable through a chain of stages connected by bounded queues,
+    so that e.g. network fetches of the next items overlap with LLM calls on the current one.
+    """
+    def __init__(self, stages: List[Stage]):
+        self.stages = stages
+
+    def _worker(self, stage: Stage, inbox: queue.Queue, outbox: Optional[queue.Queue], results: list, state: dict, lock: threading.Lock):
+        while True:
+            item = inbox.get()
+            if item is _DONE:
+                with lock:
+                    state[stage.name] -= 1
+                    last = state[stage.name] == 0
+                if last and outbox is not None:
+                    outbox.put(_DONE)
+                elif not last:
+                    inbox.put(_DONE)  # let sibling workers see the end of the stream
+                return
+
+            try:
+                output = stage.fn(item)
+            except Exception as e:
+                logger.error("Stage %s failed: %s", stage.name, e)
+                continue
+
+            if output is None:
+                continue
+            if outbox is not None:
+                outbox.put(output)
+            else:
+                with lock:
+                    results.append(output)
+
+    def run(self, source: Iterable[Any]) -> List[Any]:
+        """Feed `source` through every stage and return the items emitted by the last one."""
+        queues = [queue.Queue(maxsize=stage.maxsize) for stage in self.stages]
+        results = []
+        lock = threading.Lock()
+        state = {stage.name: stage.workers for stage in self.stages}
+        threads = []
+
+        for index, stage in enumerate(self.stages):
+            outbox = queues[index + 1] if index + 1 < len(queues) else None
+            for n in range(stage.workers):
+                thread = threading.Thread(
+                    target=self._worker,
+                    args=(stage, queues[index], outbox, results, state, lock),
+                    name=f"{stage.name}-{n}",
+                    daemon=True
+                )
+                thread.start()
+                threads.append(thread)
+
+        try:
+            for item in source:
+                queues[0].put(item)  # blocks while the first stage is saturated
+        except Exception as e:
+            logger.error("Pipeline source failed: %s", e)
+        finally:
+            queues[0].put(_DONE)
+
+        for thread in threads:
+            thread.join()
+
+        return results
@@ -0,0 +1,93 @@
+import logging
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class CacheEntry:
+    __slots__ = ('data', 'status', 'etag', 'last_modified', 'expires')
+
+    def __init__(self, data: Any, status: int, etag: Optional[str], last_modified: Optional[str], expires: float):
+        self.data = data
+        self.status = status
+        self.etag = etag
+        self.last_modified = last_modified
+        self.expires = expires
+
+    @property
+    def fresh(self) -> bool:
+        return time.monotonic() < self.expires
+
+    @property
+    def negative(self) -> bool:
+        return self.status >= 400
+
+    def validators(self) -> Dict[str, str]:
+        """Conditional request headers to revalidate a stale entry."""
+        headers = {}
+        if self.etag:
+            headers["if-none-match"] = self.etag
+        if self.last_modified:
+            headers["if-modified-since"] = self.last_modified
+        return headers
+
+
+class ResponseCache:
+    """
+    LRU cache of decoded JSON responses with a TTL per endpoint prefix.
+
+    Stale entries keep their ETag / Last-Modified so they can be revalidated with a conditional request,
+    and 403/404 answers are cached for `negative_ttl` so a missing or blocked resource is not re-requested.
+    """
+    def __init__(self, ttls: Iterable[Tuple[str, float]], default_ttl: float = 60, negative_ttl: float = 300, max_entries: int = 5000):
+        self.ttls = list(ttls)          # (endpoint prefix, seconds), first match wins
+        self.default_ttl = default_ttl
+        self.negative_ttl = negative_ttl
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[tuple, CacheEntry]" = OrderedDict()
+        self.metrics = {"hits": 0, "misses": 0, "revalidated": 0, "negative_hits": 0, "evictions": 0}
+
+    @staticmethod
+    def key(endpoint: str, params: Optional[Dict] = None) -> tuple:
+        return (endpoint, tuple(sorted((str(k), str(v)) for k, v in (params or {}).items())))
+
+    def ttl(self, endpoint: str) -> float:
+        for prefix, seconds in self.ttls:
+            if endpoint.startswith(prefix):
+                return seconds
+        return self.default_ttl
+
+    def get(self, key: tuple) -> Optional[CacheEntry]:
+        """Entry for `key`, fresh or stale (the caller revalidates stale ones); counts hits and misses."""
+        entry = self._entries.get(key)
+        if entry is None:
+            self.metrics["misses"] += 1
+            return None
+        self._entries.move_to_end(key)
+        if entry.fresh:
+            self.metrics["negative_hits" if entry.negative else "hits"] += 1
+        else:
+            self.metrics["misses"] += 1
+        return entry
+
+    def put(self, key: tuple, data: Any, status: int = 200, headers: Optional[Dict[str, str]] = None) -> None:
+        headers = {name.lower(): value for name, value in (headers or {}).items()}
+        ttl = self.negative_ttl if status >= 400 else self.ttl(key[0])
+        self._entries[key] = CacheEntry(data, status, headers.get("etag"), headers.get("last-modified"), time.monotonic() + ttl)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.metrics["evictions"] += 1
+
+    def revalidated(self, key: tuple, entry: CacheEntry) -> None:
+        """A 304 answer: keep the body and start a new TTL."""
+        entry.expires = time.monotonic() + self.ttl(key[0])
+        self._entries[key] = entry
+        self.metrics["revalidated"] += 1
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.metrics["hits"] + self.metrics["negative_hits"] + self.metrics["misses"]
+        hit_ratio = (self.metrics["hits"] + self.metrics["negative_hits"]) / lookups if lookups else 0.0
+        return {**self.metrics, "entries": len(self._entries), "hit_ratio": round(hit_ratio, 3)}
@@ -0,0 +1,195 @@
+import logging
+import re
+import time
+from datetime import datetime, timedelta
+from functools import lru_cache
+from typing import Iterable, Optional, Sequence, Tuple
+
+import numpy as np
+
+from utils.entities import Match, Settlement
+
+logger = logging.getLogger(__name__)
+
+# Settlement states of a prediction (matches.status):
+#   scheduled -> NULL
+#   live      -> "<minute> mins" (or LIVE / STARTING from the Sofascore results task)
+#   final     -> WON, or '' for a lost pick ('LOST' from the Sofascore results task), never polled again;
+#                VOID for a match past MAX_MATCH_DURATION that was never scored
+WON = 'WON'
+LOST = ''
+VOID = 'VOID'
+FINAL_STATES = (WON, LOST, 'LOST', VOID)
+LIVE_STATES = ('LIVE', 'STARTING')
+MAX_MATCH_DURATION = timedelta(hours=3)  # kickoff to final whistle incl. stoppages and delays
+
+
+class SettlementMachine:
+    """Transitions of a prediction between scheduled, live and final settlement states."""
+
+    @staticmethod
+    def is_final(status: Optional[str]) -> bool:
+        return status in FINAL_STATES
+
+    @staticmethod
+    def is_live(status: Optional[str]) -> bool:
+        return status is not None and (status.endswith(' mins') or status in LIVE_STATES)
+
+    @staticmethod
+    def minute(status: Optional[str]) -> int:
+        """Last seen match minute of a live state, 0 if unknown."""
+        try:
+            return int(status.split(' ')[0]) if status and status.endswith(' mins') else 0
+        except ValueError:
+            return 0
+
+    @staticmethod
+    def is_overdue(match: Match, now: datetime) -> bool:
+        """True once the match should be over (kickoff + MAX_MATCH_DURATION)."""
+        return match.kickoff is not None and now >= match.kickoff + MAX_MATCH_DURATION
+
+    def advance(self, match: Match, minute: int, home_score: int, away_score: int, won: Optional[bool], decided: bool) -> Settlement:
+        """
+        Transition for a match seen in play. From the 90th minute the pick is settled as WON or lost;
+        before that it stays live, unless it is already decided (e.g. an over line that has been passed),
+        which settles it as WON at once. A pick that cannot be evaluated (`won` None) stays live.
+        """
+        if won is not None and minute >= 90:
+            status = WON if won else LOST
+        elif won and decided:
+            status = WON
+        else:
+            status = f"{minute} mins"
+        return Settlement(match_id=match.match_id, home_score=home_score, away_score=away_score, status=status)
+
+    def expire(self, match: Match, now: datetime, won: Optional[bool]) -> Optional[Settlement]:
+        """
+        Transition for a match not in play; `won` is the pick evaluated on the stored score. Once the match is
+        overdue it is settled from that score (WON or lost), or voided if it was never scored or cannot be evaluated.
+        Before that there is no transition.
+        """
+        if not self.is_overdue(match, now):
+            return None
+        status = VOID if won is None else WON if won else LOST
+        return Settlement(match_id=match.match_id, home_score=match.home_results, away_score=match.away_results, status=status)
+
+    @staticmethod
+    def has_changed(match: Match, settlement: Settlement) -> bool:
+        return (match.home_results, match.away_results, match.status) != (settlement.home_score, settlement.away_score, settlement.status)
+
+
+# Market rules: a pick wins when  metric(home, away) <comparison> threshold
+DIFF, TOTAL, MIN_SCORE = 0, 1, 2          # home - away, home + away, min(home, away)
+GT, LT, EQ, NE, GE, LE = 0, 1, 2, 3, 4, 5
+UNKNOWN = -1
+
+# (sub_type_id, outcome_id) -> (metric, comparison, threshold)
+OUTCOME_RULES = {
+    (1, 1): (DIFF, GT, 0),          # 1X2 home
+    (1, 2): (DIFF, EQ, 0),          # 1X2 draw
+    (1, 3): (DIFF, LT, 0),          # 1X2 away
+    (10, 9): (DIFF, GE, 0),         # double chance 1X
+    (10, 10): (DIFF, NE, 0),        # double chance 12
+    (10, 11): (DIFF, LE, 0),        # double chance X2
+    (29, 74): (MIN_SCORE, GT, 0),   # both teams to score - yes
+    (29, 76): (MIN_SCORE, EQ, 0),   # both teams to score - no
+}
+# sub_type_id -> {bet_pick: rule}, for picks identified by name
+PICK_RULES = {
+    29: {'yes': (MIN_SCORE, GT, 0), 'no': (MIN_SCORE, EQ, 0)},
+}
+# Over/under markets settled on any line; corners (166) are scored with corner counts instead of goals
+LINE_MARKETS = (18, 166)
+LINE_PATTERN = re.compile(r'(over|under)?\s*(?:total=)?(\d+(?:\.\d+)?)', re.IGNORECASE)
+
+
+class SettlementEngine:
+    """
+    Settles picks against scores with the declarative rule tables above.
+    `settle` evaluates whole arrays of (home, away, rule) in one NumPy pass, so a tick with thousands
+    of live picks costs a handful of vector operations instead of a chain of ifs per pick.
+    """
+
+    @staticmethod
+    @lru_cache(maxsize=4096)
+    def resolve(sub_type_id=None, outcome_id=None, bet_pick=None, special_bet_value=None) -> Optional[Tuple[int, int, float]]:
+        """Rule of one pick, or None if the market is not settleable."""
+        sub_type_id = int(sub_type_id) if sub_type_id not in (None, '') else None
+        outcome_id = int(outcome_id) if outcome_id not in (None, '') and str(outcome_id).isdigit() else None
+        pick = (bet_pick or '').strip().lower()
+
+        rule = OUTCOME_RULES.get((sub_type_id, outcome_id)) or PICK_RULES.get(sub_type_id, {}).get(pick)
+        if rule:
+            return rule
+
+        if sub_type_id in LINE_MARKETS or pick.startswith(('over', 'under')):
+            side = LINE_PATTERN.match(pick)
+            line = LINE_PATTERN.search(special_bet_value or '') or side
+            if side and side.group(1) and line:
+                return (TOTAL, GT if side.group(1).lower() == 'over' else LT, float(line.group(2)))
+
+        return None
+
+    def compile(self, matches: Iterable[Match]) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """(metric, comparison, threshold) arrays of the given predictions; unknown markets get UNKNOWN."""
+        rules = [
+            self.resolve(match.sub_type_id, match.outcome_id, match.bet_pick, match.special_bet_value) or (UNKNOWN, UNKNOWN, 0.0)
+            for match in matches
+        ]
+        if not rules:
+            return np.zeros(0, dtype=np.int8), np.zeros(0, dtype=np.int8), np.zeros(0)
+        metric, comparison, threshold = zip(*rules)
+        return np.asarray(metric, dtype=np.int8), np.asarray(comparison, dtype=np.int8), np.asarray(threshold, dtype=np.float64)
+
+    def settle(self, home: Sequence, away: Sequence, metric: np.ndarray, comparison: np.ndarray, threshold: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Evaluate picks on scores (None/NaN for unscored).
+        Returns (won, decided, known): `decided` marks wins that no later goal can undo,
+        `known` marks picks that have both a rule and a score.
+        """
+        home = np.asarray(home, dtype=np.float64)
+        away = np.asarray(away, dtype=np.float64)
+        values = np.stack([home - away, home + away, np.minimum(home, away)])
+        value = values[np.clip(metric, 0, 2), np.arange(len(metric))]
+
+        won = np.select(
+            [comparison == GT, comparison == LT, comparison == EQ, comparison == NE, comparison == GE, comparison == LE],
+            [value > threshold, value < threshold, value == threshold, value != threshold, value >= threshold, value <= threshold],
+            default=False
+        )
+        known = (metric != UNKNOWN) & ~np.isnan(value)
+        won &= known
+        # goals (and corners) only ever add up, so a passed over line or a scored BTTS-yes cannot be lost again
+        decided = won & np.isin(metric, (TOTAL, MIN_SCORE)) & np.isin(comparison, (GT, GE))
+        return won, decided, known
+
+    def settle_matches(self, matches: Sequence[Match], home: Sequence, away: Sequence) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        return self.settle(home, away, *self.compile(matches))
+
+    def settle_pick(self, home_score, away_score, sub_type_id=None, outcome_id=None, bet_pick=None, special_bet_value=None) -> Optional[bool]:
+        """Single pick convenience: True/False, or None if the pick or the score is unknown."""
+        rule = self.resolve(sub_type_id, outcome_id, bet_pick, special_bet_value)
+        if rule is None:
+            return None
+        won, _, known = self.settle([home_score], [away_score], *(np.asarray([value]) for value in rule))
+        return bool(won[0]) if known[0] else None
+
+
+if __name__ == "__main__":
+    # Microbenchmark: settle random scores for every supported market shape
+    engine = SettlementEngine()
+    markets = [
+        Match(sub_type_id=1, outcome_id=1), Match(sub_type_id=1, outcome_id=2), Match(sub_type_id=10, outcome_id=9),
+        Match(sub_type_id=18, outcome_id=12, bet_pick='over 2.5', special_bet_value='total=2.5'),
+        Match(sub_type_id=18, outcome_id=13, bet_pick='under 3.5', special_bet_value='total=3.5'),
+        Match(sub_type_id=29, outcome_id=74, bet_pick='yes'), Match(sub_type_id=166, bet_pick='over 9.5', special_bet_value='total=9.5'),
+        Match(bet_pick='Over 1.5'),
+    ]
+    rng = np.random.default_rng(0)
+    for n in (1_000, 10_000, 100_000):
+        matches = [markets[i] for i in rng.integers(0, len(markets), n)]
+        home, away = rng.integers(0, 6, n), rng.integers(0, 6, n)
+        started = time.perf_counter()
+        won, decided, known = engine.settle_matches(matches, home, away)
+        elapsed = time.perf_counter() - started
+        print(f"{n:>7} settlements in {elapsed*1000:.1f} ms ({n/elapsed:,.0f}/s), won={int(won.sum())}, decided={int(decided.sum())}")
@@ -1,12 +1,20 @@
+import asyncio
 import os
 import logging
 from datetime import datetime
 from typing import List, Dict, Optional, Tuple, Any
 
-import requests
+import aiohttp
 from dotenv import load_dotenv
 from unidecode import unidecode
 
+from utils.async_http import AsyncHttp, AsyncRateLimiter
+from utils.entities import FixtureMapping
+from utils.fixtures import FixtureResolver
+from utils.odds_history import OddsHistory
+from utils.response_cache import ResponseCache
+from utils.settlement import SettlementEngine
+
 load_dotenv()
 
 logger = logging.getLogger(__name__)
@@ -19,14 +27,38 @@ SOFASCORE_SPORTS: List[str] = [
 
 class SofascoreClient:
     BASE_URL = "https://www.sofascore.com/api/v1"
-
-    def __init__(self) -> None:
-        self.session = requests.Session()
+    # shared by every client in the process: Sofascore starts answering 403 when hit too fast
+    limiter = AsyncRateLimiter(
+        concurrency=int(os.getenv("SOFASCORE_CONCURRENCY", "4")),
+        min_interval=float(os.getenv("SOFASCORE_MIN_INTERVAL", "0.25")),
+        cooldown=float(os.getenv("SOFASCORE_COOLDOWN", "120"))
+    )
+    # shared response cache, TTLs in seconds per endpoint prefix (first match wins)
+    cache = ResponseCache(
+        ttls=[
+            ("/odds/1/high-value-streaks", 900),
+            ("/odds/1/dropping/", 300),
+            ("/odds/1/winning/", 300),
+            ("/sport/", 60),               # scheduled events with live scores
+            ("/event/", 30),               # single events (results) and their odds changes
+        ],
+        default_ttl=60,
+        negative_ttl=float(os.getenv("SOFASCORE_NEGATIVE_TTL", "300"))
+    )
+
+    def __init__(self, resolver: Optional[FixtureResolver] = None, odds_history: Optional[OddsHistory] = None) -> None:
+        self.http = AsyncHttp.instance()
+        self.headers: Dict[str, str] = {}
+        self.settlement_engine = SettlementEngine()
+        self.resolver = resolver
+        self.odds_history = odds_history
+        self.dropping_hours = int(os.getenv("DROPPING_ODDS_HOURS", "24"))
+        self.dropping_min_drop = float(os.getenv("DROPPING_ODDS_MIN_DROP", "0.05"))
         self._setup_headers()
 
     def _setup_headers(self) -> None:
         """Realistic headers to mimic Brave/Chrome browser."""
-        self.session.headers.update({
+        self.headers.update({
             "accept": "*/*",
             "accept-encoding": "gzip, deflate, br, zstd",
             "accept-language": "en-US,en;q=0.9",
@@ -48,28 +80,63 @@ class SofascoreClient:
             ),
         })
 
-    def _get(self, endpoint: str, params: Optional[Dict] = None) -> Optional[Dict]:
-        """Centralized GET request with error handling."""
+    async def _get_async(self, endpoint: str, params: Optional[Dict] = None) -> Optional[Dict]:
+        """
+        Centralized GET request with error handling, under the shared Sofascore rate limiter.
+        Answers are served from the response cache while fresh and revalidated with ETag / Last-Modified once stale.
+        """
+        key = self.cache.key(endpoint, params)
+        entry = self.cache.get(key)
+        if entry is not None and entry.fresh:
+            return None if entry.negative else entry.data
+        stale = entry if entry is not None and not entry.negative else None
+
+        if self.limiter.blocked:
+            logger.warning("Skipping %s, cooling down after bot detection", endpoint)
+            return stale.data if stale else None
+
         url = f"{self.BASE_URL}{endpoint}"
+        headers = {**self.headers, **stale.validators()} if stale else self.headers
         try:
-            response = self.session.get(url, params=params, timeout=12)
+            async with self.limiter.slot():
+                response = await self.http.request("GET", url, headers=headers, params=params, timeout=12)
 
-            if response.status_code == 403:
-                logger.warning("403 Forbidden – possible bot detection")
+            if response.status == 304 and stale:
+                self.cache.revalidated(key, stale)
+                return stale.data
+
+            if response.status == 403:
+                logger.warning("403 Forbidden – possible bot detection, pausing requests for %ss", self.limiter.cooldown)
+                self.limiter.block()
+                self.cache.put(key, None, response.status)
+                return None
+
+            if response.status == 404:
+                logger.warning("404 Not Found on %s", endpoint)
+                self.cache.put(key, None, response.status)
                 return None
 
             response.raise_for_status()
-            return response.json()
+            data = response.json()
+            self.cache.put(key, data, response.status, response.headers)
+            return data
 
-        except requests.exceptions.HTTPError as e:
+        except aiohttp.ClientResponseError as e:
             logger.error("HTTP error on %s: %s", endpoint, e)
-        except requests.exceptions.RequestException as e:
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
             logger.error("Request failed on %s: %s", endpoint, e)
         except Exception as e:
             logger.error("Unexpected error on %s: %s", endpoint, e)
 
         return None
 
+    def cache_stats(self) -> Dict[str, Any]:
+        """Hit / miss / revalidation counters of the shared response cache."""
+        return self.cache.stats()
+
+    def _get(self, endpoint: str, params: Optional[Dict] = None) -> Optional[Dict]:
+        return self.http.run(self._get_async(endpoint, params))
+
     def _fractional_to_decimal(self, fractional: str) -> float:
         """Convert '4/1' → 5.0"""
         try:
@@ -79,12 +146,15 @@ class SofascoreClient:
             return 0.0
 
     def get_latest_odds(self, event_id: str) -> Tuple[Optional[str], Optional[float], float]:
+        return self.http.run(self.get_latest_odds_async(event_id))
+
+    async def get_latest_odds_async(self, event_id: str) -> Tuple[Optional[str], Optional[float], float]:
         """
         Returns: (bet_pick_name, decimal_odd, change_from_initial)
         
         If no dropping odd found → (None, None, 0)
         """
-        data = self._get(f"/event/{event_id}/odds/1/changes")
+        data = await self._get_async(f"/event/{event_id}/odds/1/changes")
         if not data:
             return None, None, 0.0
 
@@ -118,13 +188,30 @@ class SofascoreClient:
             change
         )
 
+    async def _get_per_sport_async(self, endpoint: str) -> List[Tuple[str, Optional[Dict]]]:
+        """GET `endpoint` (formatted with each sport) for all configured sports concurrently, in SOFASCORE_SPORTS order."""
+        responses = await self.http.gather(*(self._get_async(endpoint.format(sport=sport)) for sport in SOFASCORE_SPORTS))
+        return [
+            (sport, None if isinstance(data, Exception) else data)
+            for sport, data in zip(SOFASCORE_SPORTS, responses)
+        ]
+
     def get_dropping_odds(self) -> List[Dict[str, Any]]:
-        """Fetch all currently dropping 1X2 odds across configured sports."""
-        matches = []
+        return self.http.run(self.get_dropping_odds_async())
+
+    async def get_dropping_odds_async(self) -> List[Dict[str, Any]]:
+        """
+        Currently dropping home (1X2 "1") odds across configured sports.
+        Sofascore lists the events, one request per sport; the price and its drop come from our own odds history
+        of the same fixture at Betika, joined through the fixture map instead of one odds-changes request per event.
+        """
+        if self.resolver is None or self.odds_history is None:
+            logger.warning("Dropping odds need a fixture resolver and odds history")
+            return []
 
-        for sport in SOFASCORE_SPORTS:
-            logger.info("Fetching dropping odds for %s", sport.capitalize())
-            data = self._get(f"/odds/1/dropping/{sport}")
+        logger.info("Fetching dropping odds for %s", ", ".join(sport.capitalize() for sport in SOFASCORE_SPORTS))
+        candidates = []
+        for sport, data in await self._get_per_sport_async("/odds/1/dropping/{sport}"):
             if not data or "events" not in data:
                 logger.warning("No dropping odds data for %s", sport)
                 continue
@@ -134,40 +221,65 @@ class SofascoreClient:
                 start_ts = event.get("startTimestamp")
                 if not start_ts or not event_id:
                     continue
+                candidates.append((sport, event_id, datetime.fromtimestamp(start_ts).strftime("%Y-%m-%d %H:%M:%S"), event))
 
-                start_time = datetime.fromtimestamp(start_ts).strftime("%Y-%m-%d %H:%M:%S")
-                home_team = event.get("homeTeam", {}).get("name", "Unknown")
-                away_team = event.get("awayTeam", {}).get("name", "Unknown")
-                tournament = event.get("tournament", {}).get("name", "Unknown")
-                category = event.get("tournament", {}).get("category", {}).get("name", "Unknown")
+        if not candidates:
+            return []
+        movements = await asyncio.to_thread(self._dropping_movements, candidates)
 
-                bet_pick, odd, change = self.get_latest_odds(event_id)
-
-                if odd and change < 0 and bet_pick=="1":  # Only include actual dropping odds
-                    matches.append({
-                        "id": event_id,
-                        "start_time": start_time,
-                        "home_team": unidecode(home_team),
-                        "away_team": unidecode(away_team),
-                        "tournament": unidecode(tournament),
-                        "category": unidecode(category),
-                        "sport": sport.capitalize(),
-                        "bet_pick": bet_pick or "Unknown",
-                        "odd": odd,
-                        "odd_change": round(change, 2),
-                        "overall_prob": round(change, 2) 
-                    })
-
-        logger.info("Found %d dropping odds matches", len(matches))
+        matches = []
+        for (sport, event_id, start_time, event), movement in zip(candidates, movements):
+            if movement is None:
+                continue
+            change = movement.change
+            matches.append({
+                "id": event_id,
+                "start_time": start_time,
+                "home_team": unidecode(event.get("homeTeam", {}).get("name", "Unknown")),
+                "away_team": unidecode(event.get("awayTeam", {}).get("name", "Unknown")),
+                "tournament": unidecode(event.get("tournament", {}).get("name", "Unknown")),
+                "category": unidecode(event.get("tournament", {}).get("category", {}).get("name", "Unknown")),
+                "sport": sport.capitalize(),
+                "bet_pick": "1",
+                "odd": movement.current_odd,
+                "odd_change": round(change, 2),
+                "overall_prob": round(change, 2)
+            })
+
+        logger.info("Found %d dropping odds matches of %d listed events", len(matches), len(candidates))
         return matches
 
+    def _dropping_movements(self, candidates: List[Tuple[str, str, str, Dict]]) -> List[Optional[Any]]:
+        """Biggest recorded drop of the home price of each listed event's Betika fixture, None if there is none."""
+        dropping = {}
+        for movement in self.odds_history.dropping_odds(self.dropping_hours, self.dropping_min_drop, sub_type_ids=(1,)):
+            if int(movement.outcome_id) == 1:
+                dropping.setdefault(str(movement.parent_match_id), movement)   # biggest drop first
+        betika_keys = self.resolver.keys("betika", list(dropping))
+        by_key = {fixture_key: dropping[parent_match_id] for parent_match_id, fixture_key in betika_keys.items()}
+
+        fixture_keys = self.resolver.resolve([
+            FixtureMapping(
+                provider="sofascore",
+                provider_fixture_id=event_id,
+                home_team=event.get("homeTeam", {}).get("name"),
+                away_team=event.get("awayTeam", {}).get("name"),
+                kickoff=start_time,
+                category=event.get("tournament", {}).get("category", {}).get("name")
+            )
+            for _, event_id, start_time, event in candidates
+        ])
+        return [by_key.get(fixture_key) for fixture_key in fixture_keys]
+
     def get_winning_odds(self) -> List[Dict[str, Any]]:
+        return self.http.run(self.get_winning_odds_async())
+
+    async def get_winning_odds_async(self) -> List[Dict[str, Any]]:
         """Fetch 'Winning Odds' (high confidence tips from Sofascore)."""
         matches = []
 
-        for sport in SOFASCORE_SPORTS:
-            logger.info("Fetching winning odds for %s", sport.capitalize())
-            data = self._get(f"/odds/1/winning/{sport}")
+        logger.info("Fetching winning odds for %s", ", ".join(sport.capitalize() for sport in SOFASCORE_SPORTS))
+        for sport, data in await self._get_per_sport_async("/odds/1/winning/{sport}"):
             if not data:
                 continue
 
@@ -218,13 +330,15 @@ class SofascoreClient:
         logger.info("Found %d winning odds", len(matches))
         return matches
 
-    
     def get_high_value_streaks(self) -> List[Dict[str, Any]]:
+        return self.http.run(self.get_high_value_streaks_async())
+
+    async def get_high_value_streaks_async(self) -> List[Dict[str, Any]]:
         """Fetch all currently dropping 1X2 odds across configured sports."""
         matches = []
 
         logger.info("Fetching high value streaks")
-        data = self._get("/odds/1/high-value-streaks")
+        data = await self._get_async("/odds/1/high-value-streaks")
         if not data or "general" not in data:
             logger.warning("No high value streaks")
             return []
@@ -271,13 +385,39 @@ class SofascoreClient:
         logger.info("Found %d high value streaks", len(matches))
         return matches
 
-    def get_match_result(self, event_id: str, outcome_id: int = None) -> Optional[Dict]:
-        """Check if match is finished and return result + win/loss."""
-        data = self._get(f"/event/{event_id}")
+    def get_tips(self, sources: List[str]) -> List[Dict[str, Any]]:
+        return self.http.run(self.get_tips_async(sources))
+
+    async def get_tips_async(self, sources: List[str]) -> List[Dict[str, Any]]:
+        """
+        Tips of the given sources ("high_value_streaks", "dropping_odds", "winning_odds") fetched concurrently,
+        concatenated in the order the sources are given.
+        """
+        fetchers = {
+            "high_value_streaks": self.get_high_value_streaks_async,
+            "dropping_odds": self.get_dropping_odds_async,
+            "winning_odds": self.get_winning_odds_async,
+        }
+        results = await self.http.gather(*(fetchers[source]() for source in sources if source in fetchers))
+        tips = []
+        for source, result in zip([source for source in sources if source in fetchers], results):
+            if isinstance(result, Exception):
+                logger.error("Error fetching %s: %s", source, result)
+                continue
+            tips.extend(result)
+        return tips
+
+    def get_scheduled_events(self, sport: str, date: str) -> Dict[str, Dict]:
+        """All events of `sport` scheduled on `date` (YYYY-MM-DD) with their current status and score, by event id."""
+        data = self._get(f"/sport/{sport}/scheduled-events/{date}")
         if not data:
-            return None
+            return {}
+        events = {str(event["id"]): event for event in data.get("events", []) if event.get("id") is not None}
+        logger.info("Found %d scheduled %s events on %s", len(events), sport, date)
+        return events
 
-        event = data.get("event", {})
+    def settle_event(self, event: Dict, outcome_id: str = None) -> Dict:
+        """Result of an event payload (from /event/{id} or a scheduled-events listing) + win/loss of the pick."""
         status_type = event.get("status", {}).get("type")
 
         if status_type != "finished":
@@ -291,13 +431,10 @@ class SofascoreClient:
         away_team = event.get("awayTeam", {}).get("name")
         home_score = event.get("homeScore", {}).get("current", 0)
         away_score = event.get("awayScore", {}).get("current", 0)
-        winner_code = event.get("winnerCode")
         
-        status = "WON" if (
-            outcome_id=="Over 1.5" and (home_score+away_score) > 1
-        ) or (
-            outcome_id=="Over 2.5" and (home_score+away_score) > 2
-        ) else "LOST" 
+        # outcome_id is the stored pick ("Over 1.5"); anything that does not settle as won is lost
+        won = self.settlement_engine.settle_pick(home_score, away_score, bet_pick=outcome_id)
+        status = "WON" if won else "LOST"
 
         return {
             "home_team": home_team,
@@ -305,4 +442,11 @@ class SofascoreClient:
             "home_score": home_score,
             "away_score": away_score,
             "status": status
-        }
\ No newline at end of file
+        }
+
+    def get_match_result(self, event_id: str, outcome_id: str = None) -> Optional[Dict]:
+        """Check if match is finished and return result + win/loss."""
+        data = self._get(f"/event/{event_id}")
+        if not data:
+            return None
+        return self.settle_event(data.get("event", {}), outcome_id)
@@ -1,17 +1,21 @@
 
+import asyncio
 import logging
-import requests
 import json
 
+import aiohttp
+
+from utils.async_http import AsyncHttp
+
 logger = logging.getLogger(__name__)
 
 class Sportpesa:
     def __init__(self):
         self.base_url = "https://jackpot-offer-api.ke.sportpesa.com/api"
-        self.session = requests.Session()
+        self.http = AsyncHttp.instance()
         
         # Realistic browser headers
-        self.session.headers.update({
+        self.headers = {
             "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/131.0.0.0 Safari/537.36",
             "Accept": "application/json, text/plain, */*",
             "Accept-Language": "en-US,en;q=0.9",
@@ -22,17 +26,18 @@ class Sportpesa:
             "Sec-Fetch-Dest": "empty",
             "Sec-Fetch-Mode": "cors",
             "Sec-Fetch-Site": "same-origin",
-            # Remove Host header - let requests set it
-        })
+            # Remove Host header - let aiohttp set it
+        }
 
-    def get_data(self, endpoint, params=None):
+    async def get_data_async(self, endpoint, params=None):
+        response = None
         try:
             url = f"{self.base_url}{endpoint}"
             logger.info("Fetching: %s", url)
-            response = self.session.get(url, params=params, timeout=10)
-            logger.info("Status: %s", response.status_code)
+            response = await self.http.request("GET", url, headers=self.headers, params=params, timeout=10)
+            logger.info("Status: %s", response.status)
             
-            if response.status_code == 403:
+            if response.status == 403:
                 logger.error("403 Forbidden - likely blocked by Cloudflare/anti-bot")
                 logger.error("Response snippet: %s", response.text[:500])
                 return None
@@ -40,9 +45,9 @@ class Sportpesa:
             response.raise_for_status()
             return response.json().get("response", response.json())
         
-        except requests.exceptions.HTTPError as http_err:
+        except aiohttp.ClientResponseError as http_err:
             logger.error("HTTP error: %s", http_err)
-        except requests.exceptions.RequestException as req_err:
+        except (aiohttp.ClientError, asyncio.TimeoutError) as req_err:
             logger.error("Request error: %s", req_err)
         except json.JSONDecodeError:
             logger.error("Invalid JSON response: %s", response.text[:500])
@@ -50,6 +55,9 @@ class Sportpesa:
             logger.error("Unexpected error: %s", err)
         return None
 
+    def get_data(self, endpoint, params=None):
+        return self.http.run(self.get_data_async(endpoint, params))
+
     def get_active_jackpot_matches(self):
         endpoint = "/jackpots/active"
         jackpot = self.get_data(endpoint)
@@ -0,0 +1,173 @@
+import logging
+import os
+import time
+from datetime import datetime
+from typing import Dict, List, Optional, Set, Tuple
+
+from utils.entities import FixtureMapping
+from utils.fixtures import sportradar_key, team_tokens
+from utils.odds_matrix import OddsMatrix
+
+logger = logging.getLogger(__name__)
+
+
+class SportybetCatalog:
+    """
+    Local index of Sportybet pre-match events, loaded in bulk from the upcoming-events listing.
+
+    Events are indexed by sr:match id and by (date, team token), so resolving a tip to a Sportybet event is a
+    few dict lookups instead of one firstSearch request per word of both team names.
+    """
+    def __init__(self, client, ttl: int = int(os.getenv("SPORTYBET_CATALOG_TTL", "900")),
+                 hours: int = int(os.getenv("SPORTYBET_CATALOG_HOURS", "72")),
+                 sport_ids: Optional[List[str]] = None, page_size: int = 100):
+        self.client = client
+        self.ttl = ttl
+        self.hours = hours
+        self.sport_ids = sport_ids or [sport.strip() for sport in os.getenv("SPORTYBET_SPORT_IDS", "sr:sport:1").split(",")]
+        self.page_size = page_size
+        self.by_id: Dict[str, Dict] = {}
+        self.by_date: Dict[str, List[Dict]] = {}
+        self.by_token: Dict[Tuple[str, str], Set[str]] = {}
+        self._loaded = 0.0
+        self._odds_matrix: Optional[OddsMatrix] = None
+
+    @staticmethod
+    def event_date(event: Dict) -> str:
+        return datetime.fromtimestamp(event["estimateStartTime"] / 1000).strftime("%Y-%m-%d")
+
+    async def _fetch_page_async(self, sport_id: str, page: int) -> Optional[Dict]:
+        return await self.client.get_async("/factsCenter/pcUpcomingEvents", {
+            "sportId": sport_id,
+            "marketId": "1,18,10,29",
+            "pageSize": self.page_size,
+            "pageNum": page,
+            "option": 1,
+            "timeline": self.hours
+        })
+
+    async def _fetch_sport_async(self, sport_id: str) -> List[Dict]:
+        """All upcoming events of a sport: page 1 gives the total, the remaining pages are fetched concurrently."""
+        first = await self._fetch_page_async(sport_id, 1)
+        if not first or "data" not in first:
+            return []
+        pages = [first]
+        total = first["data"].get("totalNum", 0)
+        remaining = range(2, (total + self.page_size - 1) // self.page_size + 1)
+        for page in await self.client.http.gather(*(self._fetch_page_async(sport_id, page) for page in remaining)):
+            if isinstance(page, Exception) or not page or "data" not in page:
+                logger.warning("Missing Sportybet listing page for %s: %s", sport_id, page)
+                continue
+            pages.append(page)
+        return [
+            event
+            for page in pages
+            for tournament in page["data"].get("tournaments", [])
+            for event in tournament.get("events", [])
+        ]
+
+    def refresh(self, force: bool = False) -> int:
+        """Reload the catalog if it is older than `ttl`. Returns the number of indexed events."""
+        if not force and self._loaded and time.monotonic() - self._loaded < self.ttl:
+            return len(self.by_id)
+
+        events = [
+            event
+            for sport_id in self.sport_ids
+            for event in self.client.http.run(self._fetch_sport_async(sport_id))
+        ]
+        by_id, by_date, by_token = {}, {}, {}
+        for event in events:
+            event_id = event.get("eventId")
+            if not event_id or not event.get("estimateStartTime"):
+                continue
+            date = self.event_date(event)
+            by_id[event_id] = event
+            by_date.setdefault(date, []).append(event)
+            for token in team_tokens(event.get("homeTeamName")) | team_tokens(event.get("awayTeamName")):
+                by_token.setdefault((date, token), set()).add(event_id)
+
+        if by_id or not self._loaded:
+            self.by_id, self.by_date, self.by_token = by_id, by_date, by_token
+            self._odds_matrix = None
+        self._loaded = time.monotonic()
+        logger.info("Indexed %d Sportybet events over %d dates", len(self.by_id), len(self.by_date))
+        return len(self.by_id)
+
+    def covers(self, date: str) -> bool:
+        self.refresh()
+        return date in self.by_date
+
+    def get(self, sr_match_id) -> Optional[Dict]:
+        """Event by its Sportradar id ("sr:match:123" or 123)."""
+        self.refresh()
+        sr_match_id = str(sr_match_id)
+        return self.by_id.get(sr_match_id if sr_match_id.startswith("sr:match:") else f"sr:match:{sr_match_id}")
+
+    def find(self, home_team: str, away_team: str, date: str, category: Optional[str] = None) -> Optional[Dict]:
+        """
+        Best event on `date` sharing a token with both team names (and in `category`, if given);
+        ties are broken by the number of shared tokens.
+        """
+        self.refresh()
+        home, away = team_tokens(home_team), team_tokens(away_team)
+        candidates = set()
+        for token in home | away:
+            candidates |= self.by_token.get((date, token), set())
+
+        best, best_score = None, 0
+        for event_id in sorted(candidates):
+            event = self.by_id[event_id]
+            if category and category != event.get("sport", {}).get("category", {}).get("name"):
+                continue
+            home_shared = home & team_tokens(event.get("homeTeamName"))
+            away_shared = away & team_tokens(event.get("awayTeamName"))
+            if not home_shared or not away_shared:
+                continue
+            score = len(home_shared) + len(away_shared)
+            if score > best_score:
+                best, best_score = event, score
+        return best
+
+    def odds_matrix(self) -> OddsMatrix:
+        """Prices of every catalogued event, keyed by the numeric Sportradar id as parent_match_id; built once per load."""
+        self.refresh()
+        if self._odds_matrix is not None:
+            return self._odds_matrix
+        odds_matrix = OddsMatrix()
+        for event_id, event in self.by_id.items():
+            parent_match_id = event_id.replace("sr:match:", "")
+            if not parent_match_id.isdigit():
+                continue
+            for market in event.get("markets") or []:
+                for outcome in market.get("outcomes", []):
+                    try:
+                        odds_matrix.add(
+                            parent_match_id,
+                            market.get("id"),
+                            outcome.get("id"),
+                            outcome.get("odds"),
+                            special_bet_value=market.get("specifier") or '',
+                            odd_key=outcome.get("desc"),
+                            market_name=market.get("name")
+                        )
+                    except (TypeError, ValueError):
+                        continue
+        self._odds_matrix = odds_matrix
+        return odds_matrix
+
+    def mappings(self) -> List[FixtureMapping]:
+        """Catalogued events as fixture_map rows, keyed by their Sportradar id."""
+        self.refresh()
+        return [
+            FixtureMapping(
+                provider="sportybet",
+                provider_fixture_id=event_id,
+                fixture_key=sportradar_key(event_id),
+                home_team=event.get("homeTeamName"),
+                away_team=event.get("awayTeamName"),
+                kickoff=datetime.fromtimestamp(event["estimateStartTime"] / 1000),
+                category=event.get("sport", {}).get("category", {}).get("name")
+            )
+            for event_id, event in self.by_id.items()
+        ]
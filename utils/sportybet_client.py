@@ -1,9 +1,15 @@
+import asyncio
 import logging
 import json
 from datetime import datetime
 from typing import Dict, List, Optional, Any
 
-import requests
+import aiohttp
+
+from utils.async_http import AsyncHttp
+from utils.entities import FixtureMapping
+from utils.fixtures import FixtureResolver, sportradar_key
+from utils.sportybet_catalog import SportybetCatalog
 
 logger = logging.getLogger(__name__)
 
@@ -11,13 +17,16 @@ logger = logging.getLogger(__name__)
 class SportybetClient:
     BASE_URL = "https://www.sportybet.com/api/ke"
 
-    def __init__(self) -> None:
-        self.session = requests.Session()
+    def __init__(self, resolver: Optional[FixtureResolver] = None) -> None:
+        self.http = AsyncHttp.instance()
+        self.headers: Dict[str, str] = {}
+        self.catalog = SportybetCatalog(self)
+        self.resolver = resolver
         self._setup_headers()
 
     def _setup_headers(self) -> None:
         """Set realistic browser-like headers."""
-        self.session.headers.update({
+        self.headers.update({
             "accept": "*/*",
             "content-type": "application/json",
             "origin": "https://www.sportybet.com",
@@ -33,13 +42,14 @@ class SportybetClient:
             ),
         })
 
-    def _request(self, method: str, endpoint: str, **kwargs) -> Optional[Dict[Any, Any]]:
+    async def _request_async(self, method: str, endpoint: str, params: Optional[Dict] = None, payload: Optional[Dict] = None) -> Optional[Dict[Any, Any]]:
         """Unified request handler with proper error logging."""
         url = f"{self.BASE_URL}{endpoint}"
+        response = None
         try:
-            response = self.session.request(method, url, timeout=10, **kwargs)
+            response = await self.http.request(method, url, headers=self.headers, params=params, json_body=payload, timeout=10)
 
-            if response.status_code == 403:
+            if response.status == 403:
                 logger.error("403 Forbidden - likely blocked by anti-bot protection")
                 logger.debug("Response snippet: %s", response.text[:500])
                 return None
@@ -48,9 +58,9 @@ class SportybetClient:
             data = response.json()
             return data.get("response", data)
 
-        except requests.exceptions.HTTPError as e:
+        except aiohttp.ClientResponseError as e:
             logger.error("HTTP error for %s %s: %s", method.upper(), endpoint, e)
-        except requests.exceptions.RequestException as e:
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
             logger.error("Network error for %s %s: %s", method.upper(), endpoint, e)
         except json.JSONDecodeError:
             logger.error("Invalid JSON received: %s", response.text[:500])
@@ -59,11 +69,20 @@ class SportybetClient:
 
         return None
 
+    def _request(self, method: str, endpoint: str, params: Optional[Dict] = None, payload: Optional[Dict] = None) -> Optional[Dict[Any, Any]]:
+        return self.http.run(self._request_async(method, endpoint, params=params, payload=payload))
+
+    async def get_async(self, endpoint: str, params: Optional[Dict] = None) -> Optional[Dict]:
+        return await self._request_async("GET", endpoint, params=params)
+
+    async def post_async(self, endpoint: str, payload: Dict) -> Optional[Dict]:
+        return await self._request_async("POST", endpoint, payload=payload)
+
     def get(self, endpoint: str, params: Optional[Dict] = None) -> Optional[Dict]:
         return self._request("GET", endpoint, params=params)
 
     def post(self, endpoint: str, payload: Dict) -> Optional[Dict]:
-        return self._request("POST", endpoint, json=payload)  # Use json= for proper serialization
+        return self._request("POST", endpoint, payload=payload)
 
     def search_event(self, event: Dict) -> Optional[Dict[str, Any]]:
         """
@@ -95,6 +114,66 @@ class SportybetClient:
             logger.warning("Invalid bet_pick: %s", event["outcome_id"])
             return None
 
+        # a tip resolved before is a cached join on its canonical Sportradar key
+        fixture_key = self.resolver.lookup("sofascore", event["id"]) if self.resolver else None
+        match = self.catalog.get(fixture_key[3:]) if fixture_key and fixture_key.startswith("sr:") else None
+        if match is None and self.catalog.covers(target_date):
+            match = self.catalog.find(event["home_team"], event["away_team"], target_date, event["category"])
+        if match is not None:
+            if self._apply_market(event, match, target_outcome):
+                self._link(event, match)
+                return event
+        elif not self.catalog.covers(target_date):
+            match = self._search_remote(event, home_team, away_team, target_date, target_outcome)
+            if match:
+                self._link(event, match)
+                return event
+                            
+        logger.info("No matching sportybet event found for: %s vs %s on %s", event["home_team"], event["away_team"], target_date)
+        
+        event["category"] = f'{event["category"]} - {event["tournament"]}'
+        return event
+
+    def _link(self, event: Dict, match: Dict) -> None:
+        """Remember which Sportybet (Sportradar) fixture a Sofascore tip resolved to."""
+        fixture_key = sportradar_key(match.get("eventId"))
+        if self.resolver is None or fixture_key is None:
+            return
+        for provider, provider_fixture_id, home_team, away_team in (
+            ("sofascore", event["id"], event["home_team"], event["away_team"]),
+            ("sportybet", match.get("eventId"), match.get("homeTeamName"), match.get("awayTeamName"))
+        ):
+            self.resolver.link(FixtureMapping(
+                provider=provider,
+                provider_fixture_id=provider_fixture_id,
+                fixture_key=fixture_key,
+                home_team=home_team,
+                away_team=away_team,
+                kickoff=event["start_time"],
+                category=event["category"],
+                score=1.0
+            ))
+
+    def _apply_market(self, event: Dict, match: Dict, target_outcome: str) -> bool:
+        """Copy the Sportybet ids and odd of the tipped outcome into `event`. False if the market is not offered."""
+        for market in match.get("markets") or []:
+            if market.get("name") != event["prediction"]:
+                continue
+            
+            for outcome in market.get("outcomes", []):
+                if outcome.get("desc") == target_outcome:
+                    parent_match_id = match.get("eventId", "").replace("sr:match:", "")
+                    event["parent_match_id"] = parent_match_id
+                    event["sub_type_id"] = market.get("id")           
+                    event["outcome_id"] = outcome.get("id")                          
+                    event["category"] = f'{event["category"]} - {event["tournament"]}'
+                    event["odd"] = outcome.get("odds")   
+
+                    return True
+        return False
+
+    def _search_remote(self, event: Dict, home_team: str, away_team: str, target_date: str, target_outcome: str) -> Optional[Dict]:
+        """Keyword search fallback for dates outside the catalog window (one request per team-name word)."""
         endpoint = "/factsCenter/event/firstSearch"
         params = {"pageSize": 20}
 
@@ -117,25 +196,9 @@ class SportybetClient:
                     and any(k in away_name for k in set(away_team.split()))
                     and event["category"] == match.get("sport", {}).get("category", {}).get("name")):
 
-                    for market in match.get("markets"):
-                        if market.get("name") != event["prediction"]:
-                            continue
-                        
-                        for outcome in market.get("outcomes", []):
-                            if outcome.get("desc") == target_outcome:
-                                parent_match_id = match.get("eventId", "").replace("sr:match:", "")
-                                event["parent_match_id"] = parent_match_id
-                                event["sub_type_id"] = market.get("id")           
-                                event["outcome_id"] = outcome.get("id")                          
-                                event["category"] = f'{event["category"]} - {event["tournament"]}'
-                                event["odd"] = outcome.get("odds")   
-
-                                return event
-                            
-        logger.info("No matching sportybet event found for: %s vs %s on %s", event["home_team"], event["away_team"], target_date)
-        
-        event["category"] = f'{event["category"]} - {event["tournament"]}'
-        return event
+                    if self._apply_market(event, match, target_outcome):
+                        return match
+        return None
 
     def book_bet(self, events: List[Dict]) -> Optional[str]:
         """
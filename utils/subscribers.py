@@ -0,0 +1,64 @@
+import logging
+import os
+import threading
+import time
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from utils.db import Db
+
+logger = logging.getLogger(__name__)
+
+
+class SubscriberCache:
+    """
+    In-memory view of the subscribers table, used to target pushes at paying users only.
+
+    The first refresh loads every subscriber; later refreshes only read the rows changed since the newest
+    change seen. Expiry is evaluated on read, so a lapsed subscription drops out without a refresh.
+    """
+    _instance = None
+    _instance_lock = threading.Lock()
+
+    def __init__(self, db: Optional[Db] = None, ttl: int = int(os.getenv('SUBSCRIBER_REFRESH_SECONDS', '300'))):
+        self._db = db
+        self.ttl = ttl
+        self._expires_at: Dict[str, datetime] = {}
+        self._since: Optional[datetime] = None
+        self._refreshed = 0.0
+        self._lock = threading.Lock()
+
+    @classmethod
+    def instance(cls) -> "SubscriberCache":
+        with cls._instance_lock:
+            if cls._instance is None:
+                cls._instance = cls()
+            return cls._instance
+
+    @property
+    def db(self) -> Db:
+        if self._db is None:
+            self._db = Db()
+        return self._db
+
+    def refresh(self) -> int:
+        """Apply the subscriber rows changed since the last refresh. Returns the number of rows read."""
+        rows = self.db.fetch_subscribers(self._since)
+        for subscriber_id, expires_at, changed_at in rows:
+            if expires_at is None:
+                self._expires_at.pop(subscriber_id, None)
+            else:
+                self._expires_at[subscriber_id] = expires_at
+            if changed_at is not None and (self._since is None or changed_at > self._since):
+                self._since = changed_at
+        self._refreshed = time.monotonic()
+        logger.info("Refreshed %d subscribers, %d cached", len(rows), len(self._expires_at))
+        return len(rows)
+
+    def active(self, now: Optional[datetime] = None) -> List[str]:
+        """Ids of the subscribers whose subscription has not expired, refreshing the cache when stale."""
+        with self._lock:
+            if time.monotonic() - self._refreshed >= self.ttl or not self._refreshed:
+                self.refresh()
+            now = now or datetime.now()
+            return sorted(subscriber_id for subscriber_id, expires_at in self._expires_at.items() if expires_at > now)
@@ -0,0 +1,128 @@
+import logging
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+
+from utils.entities import Fixture, FixtureMapping, ValueCandidate
+from utils.fixtures import FixtureResolver
+from utils.odds_matrix import OddsMatrix
+from utils.sportybet_catalog import SportybetCatalog
+
+logger = logging.getLogger(__name__)
+
+
+class ValueEngine:
+    """
+    Cross-book odds comparison on top of OddsMatrix.
+
+    Every book's entries are hash-joined on (canonical fixture key, sub_type_id, outcome_id, special_bet_value);
+    the consensus of an outcome is the mean overround-free probability of the *other* books that price it, and
+    the edge of a price is odd × consensus - 1. All books are compared in a few array passes.
+    """
+    def __init__(self):
+        self.books: Dict[str, tuple] = {}   # provider -> (OddsMatrix, {parent_match_id: fixture_key})
+
+    def add_book(self, provider: str, odds_matrix: OddsMatrix, fixture_keys: Dict[int, str]) -> None:
+        self.books[provider] = (odds_matrix, fixture_keys)
+
+    def rank(self, target: str, min_edge: float = 0.0, min_books: int = 2, sub_type_ids: Optional[Iterable[int]] = None) -> List[ValueCandidate]:
+        """Outcomes of `target` priced above consensus by at least `min_edge`, best edge first."""
+        if target not in self.books:
+            return []
+
+        fixture_codes: Dict[str, int] = {}
+        line_codes: Dict[str, int] = {}
+        columns = []
+        for book, (provider, (odds_matrix, fixture_keys)) in enumerate(self.books.items()):
+            if not len(odds_matrix):
+                continue
+            a = odds_matrix.arrays
+            row_fixture = np.asarray([
+                fixture_codes.setdefault(fixture_keys[pmid], len(fixture_codes)) if pmid in fixture_keys else -1
+                for pmid in odds_matrix.fixture_ids
+            ], dtype=np.int64)
+            row_line = np.asarray([line_codes.setdefault(line, len(line_codes)) for line in odds_matrix.lines], dtype=np.int64)
+            columns.append({
+                'book': np.full(len(a['odd']), book, dtype=np.int64),
+                'entry': np.arange(len(a['odd'])),
+                'fixture': row_fixture[a['fixture']],
+                'sub_type_id': a['sub_type_id'],
+                'outcome_id': a['outcome_id'],
+                'line': row_line[a['line']],
+                'odd': a['odd'],
+                'fair': a['fair'],
+            })
+        if not columns:
+            return []
+
+        c = {name: np.concatenate([column[name] for column in columns]) for name in columns[0]}
+        known = c['fixture'] >= 0
+        if sub_type_ids is not None:
+            known &= np.isin(c['sub_type_id'], list(sub_type_ids))
+        c = {name: values[known] for name, values in c.items()}
+        if not len(c['odd']):
+            return []
+
+        # hash join: one group per (fixture, sub_type_id, outcome_id, line) across books
+        group = np.unique(np.stack([c['fixture'], c['sub_type_id'], c['outcome_id'], c['line']], axis=1), axis=0, return_inverse=True)[1].reshape(-1)
+        books = np.bincount(group)
+        fair_sum = np.bincount(group, weights=c['fair'])
+
+        target_book = list(self.books).index(target)
+        is_target = c['book'] == target_book
+        others = books[group] - 1
+        consensus = np.divide(fair_sum[group] - c['fair'], others, out=np.zeros(len(group)), where=others > 0)
+        edge = c['odd'] * consensus - 1
+        selected = np.flatnonzero(is_target & (books[group] >= min_books) & (others > 0) & (edge >= min_edge))
+        selected = selected[np.argsort(-edge[selected], kind='stable')]
+
+        odds_matrix, fixture_keys = self.books[target]
+        candidates = []
+        for index in selected:
+            entry = odds_matrix.entry(int(c['entry'][index]))
+            candidates.append(ValueCandidate(
+                fixture_key=fixture_keys[entry['parent_match_id']],
+                provider=target,
+                parent_match_id=entry['parent_match_id'],
+                sub_type_id=entry['sub_type_id'],
+                outcome_id=entry['outcome_id'],
+                special_bet_value=entry['special_bet_value'],
+                bet_pick=entry['odd_key'],
+                odd=entry['odd_value'],
+                probability=round(entry['fair_probability'], 4),
+                consensus_probability=round(float(consensus[index]), 4),
+                books=int(books[group[index]]),
+                edge=round(float(edge[index]), 4)
+            ))
+        logger.info("Found %d value outcomes at %s across %d books", len(candidates), target, len(self.books))
+        return candidates
+
+
+def betika_sportybet_candidates(resolver: FixtureResolver, catalog: SportybetCatalog, fixtures: List[Fixture],
+                                betika_odds: OddsMatrix, target: str = "betika", min_edge: float = 0.0) -> List[ValueCandidate]:
+    """
+    Resolve Betika listing fixtures against the Sportybet catalog and rank the value outcomes of `target`.
+    Betika prices come from `betika_odds` (listing 1X2 plus any fetched match details).
+    """
+    sportybet = catalog.mappings()
+    betika = [
+        FixtureMapping(
+            provider="betika",
+            provider_fixture_id=fixture.parent_match_id,
+            home_team=fixture.home_team,
+            away_team=fixture.away_team,
+            kickoff=fixture.start_time,
+            category=fixture.category
+        )
+        for fixture in fixtures
+    ]
+    resolver.resolve(sportybet + betika)
+    resolver.flush()
+
+    engine = ValueEngine()
+    engine.add_book("betika", betika_odds, {int(mapping.provider_fixture_id): mapping.fixture_key for mapping in betika})
+    engine.add_book("sportybet", catalog.odds_matrix(), {
+        int(mapping.provider_fixture_id.replace("sr:match:", "")): mapping.fixture_key
+        for mapping in sportybet if mapping.provider_fixture_id.replace("sr:match:", "").isdigit()
+    })
+    return engine.rank(target, min_edge=min_edge)